@@ -0,0 +1,701 @@
+""" Module for defining an AVL tree stored as columns of arrays instead of linked node objects """
+
+from array import array
+from collections import deque
+from typing import Optional, Any
+from orderedindex import OrderedIndex
+
+# Index of a missing child or parent
+NIL = -1
+
+class ArrayNode:
+    """
+    Cursor to a slot of an ArrayTree, it quacks like tree.Node.
+    Cursors are created on demand, two cursors to the same slot compare equal.
+    """
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: "ArrayTree", index: int):
+        """
+        Args:
+            tree (ArrayTree): The tree owning the slot
+            index (int): The slot
+        """
+        self.tree = tree
+        self.index = index
+
+    @property
+    def value(self) -> Any:
+        return self.tree.values[self.index]
+
+    @property
+    def key(self) -> int:
+        return self.tree.keys[self.index]
+
+    @property
+    def height(self) -> int:
+        return self.tree.heights[self.index]
+
+    @property
+    def parent(self) -> Optional["ArrayNode"]:
+        return self.tree.node(self.tree.parents[self.index])
+
+    @property
+    def left(self) -> Optional["ArrayNode"]:
+        return self.tree.node(self.tree.lefts[self.index])
+
+    @property
+    def right(self) -> Optional["ArrayNode"]:
+        return self.tree.node(self.tree.rights[self.index])
+
+    def prev(self) -> Optional["ArrayNode"]:
+        """ Returns the previous node in in-order traversal """
+        return self.tree.node(self.tree.prev_index(self.index))
+
+    def next(self) -> Optional["ArrayNode"]:
+        """ Returns the next node in in-order traversal """
+        return self.tree.node(self.tree.next_index(self.index))
+
+    def balance_factor(self) -> int:
+        """ Returns the balance factor of the node """
+        return self.tree.balance_factor(self.index)
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
+
+    def __str__(self):
+        return f"{self.value}[{self.balance_factor()}]"
+
+class ArrayTree(OrderedIndex):
+    """
+    AVL tree keeping its nodes as a struct of arrays, the array index backend.
+    Every node is a slot shared by the columns: its integer key, left, right and parent slots, its height
+    and its subtree size live in typed arrays, only the values themselves stay Python objects.
+    Comparisons happen between machine integers, a node costs around 35 bytes instead of a full object,
+    and deleted slots go to a free list to be reused by the next insertions.
+    Subtree sizes give rank, select and counts in O(log n).
+    Attributes:
+        key (callable): Maps each value to an int that sorts like the value, like point.pack
+    """
+
+    def __init__(self, extent = None, lo_key = None, key = None):
+        """
+        Array tree constructor
+        Args:
+            extent (callable, optional): Maps each value to the end of the interval it spans, see OrderedIndex
+            lo_key (callable, optional): Maps an extent bound to the lowest value whose interval could reach it
+            key (callable, optional): Maps each value to an int fitting in 64 bits and sorting like the value.
+                None stores plain ints.
+        """
+        super().__init__(extent, lo_key)
+        self.key = key if key is not None else int
+        self.clear()
+        self.version = 0
+
+    def clear(self):
+        """ Clear the tree """
+        self.keys = array("q")
+        self.lefts = array("i")
+        self.rights = array("i")
+        self.parents = array("i")
+        self.heights = array("b")
+        self.sizes = array("i")
+        self.values = []
+        self.free = []
+        self.root_index = NIL
+        self.version += 1
+
+    def __len__(self) -> int:
+        return len(self.values) - len(self.free)
+
+    @property
+    def root(self) -> Optional[ArrayNode]:
+        """ The root node """
+        return self.node(self.root_index)
+
+    def node(self, index: int) -> Optional[ArrayNode]:
+        """
+        Returns a cursor to a slot
+        Args:
+            index (int): The slot
+        Returns:
+            Optional[ArrayNode]: The cursor, or None for NIL
+        """
+        return None if index == NIL else ArrayNode(self, index)
+
+    # ------------------------------------------------
+    # Slots
+    # ------------------------------------------------
+
+    def __alloc(self, key: int, value, parent: int) -> int:
+        if self.free:
+            index = self.free.pop()
+            self.keys[index] = key
+            self.lefts[index] = NIL
+            self.rights[index] = NIL
+            self.parents[index] = parent
+            self.heights[index] = 1
+            self.sizes[index] = 1
+            self.values[index] = value
+            return index
+        self.keys.append(key)
+        self.lefts.append(NIL)
+        self.rights.append(NIL)
+        self.parents.append(parent)
+        self.heights.append(1)
+        self.sizes.append(1)
+        self.values.append(value)
+        return len(self.values) - 1
+
+    def __release(self, index: int):
+        # drop the reference, the slot is reused by the next insertion
+        self.values[index] = None
+        self.free.append(index)
+
+    def __update_height(self, index: int):
+        left = self.lefts[index]
+        right = self.rights[index]
+        left_h = self.heights[left] if left != NIL else 0
+        right_h = self.heights[right] if right != NIL else 0
+        self.heights[index] = 1 + (left_h if left_h > right_h else right_h)
+        self.sizes[index] = 1 + (self.sizes[left] if left != NIL else 0) + (self.sizes[right] if right != NIL else 0)
+
+    def __resize_path(self, index: int, delta: int):
+        # rebalance stops early, the sizes above still have to follow
+        sizes = self.sizes
+        parents = self.parents
+        while index != NIL:
+            sizes[index] += delta
+            index = parents[index]
+
+    def balance_factor(self, index: int) -> int:
+        """ Returns the balance factor of a slot """
+        left = self.lefts[index]
+        right = self.rights[index]
+        return (self.heights[left] if left != NIL else 0) - (self.heights[right] if right != NIL else 0)
+
+    # ------------------------------------------------
+    # Search
+    # ------------------------------------------------
+
+    def locate(self, key: int) -> tuple[int, bool]:
+        """
+        Walks down to a key
+        Args:
+            key (int): The key to look for
+        Returns:
+            (int, bool): The slot holding the key and True, or the slot where it could be added and False.
+                (NIL, False) if the tree is empty.
+        """
+        keys = self.keys
+        lefts = self.lefts
+        rights = self.rights
+        index = self.root_index
+        if index == NIL:
+            return (NIL, False)
+        while True:
+            current = keys[index]
+            if key == current:
+                return (index, True)
+            child = lefts[index] if key < current else rights[index]
+            if child == NIL:
+                return (index, False)
+            index = child
+
+    def search_closer(self, item, cmp_func = None) -> tuple[Optional[ArrayNode], bool]:
+        """
+        Search but return allways, see tree.Tree.search_closer
+        Args:
+            item (Any): The item to search for
+            cmp_func (callable, optional): A comparison function that takes a value and returns like tree.Tree's does.
+                If None, the item keys are compared.
+        Returns:
+            (Optional[ArrayNode], bool): A tuple containing the found node (or parent)
+        """
+        if cmp_func is None:
+            index, found = self.locate(self.key(item))
+            return (self.node(index), found)
+        index = self.root_index
+        if index == NIL:
+            return (None, False)
+        while True:
+            result = cmp_func(self.values[index])
+            if result == 0:
+                return (self.node(index), True)
+            child = self.lefts[index] if result < 0 else self.rights[index]
+            if child == NIL:
+                return (self.node(index), False)
+            index = child
+
+    def search(self, item) -> Optional[ArrayNode]:
+        """
+        Search and return None if not found
+        Args:
+            item (Any): The item to search for
+        Returns:
+            Optional[ArrayNode]: The found node or None if not found
+        """
+        index, found = self.locate(self.key(item))
+        return self.node(index) if found else None
+
+    def __contains__(self, item):
+        return self.locate(self.key(item))[1]
+
+    def contains(self, item) -> bool:
+        """
+        Check if the tree contains the item
+        Args:
+            item (Any): The item to check for
+        Returns:
+            bool: True if the item is in the tree, False otherwise
+        """
+        return item in self
+
+    # ------------------------------------------------
+    # Balancing
+    # ------------------------------------------------
+
+    def __replace_child(self, parent: int, old: int, new: int):
+        if parent == NIL:
+            self.root_index = new
+        elif self.lefts[parent] == old:
+            self.lefts[parent] = new
+        else:
+            self.rights[parent] = new
+
+    def rotate_left(self, x: int) -> int:
+        """
+        Rotates a slot to the left
+        Args:
+            x (int): The slot to rotate, must have a right child
+        Returns:
+            int: The new root of the subtree
+        """
+        y = self.rights[x]
+        b = self.lefts[y]
+        parent = self.parents[x]
+        self.parents[y] = parent
+        self.__replace_child(parent, x, y)
+        self.lefts[y] = x
+        self.parents[x] = y
+        self.rights[x] = b
+        if b != NIL:
+            self.parents[b] = x
+        self.__update_height(x)
+        self.__update_height(y)
+        return y
+
+    def rotate_right(self, x: int) -> int:
+        """
+        Rotates a slot to the right
+        Args:
+            x (int): The slot to rotate, must have a left child
+        Returns:
+            int: The new root of the subtree
+        """
+        y = self.lefts[x]
+        b = self.rights[y]
+        parent = self.parents[x]
+        self.parents[y] = parent
+        self.__replace_child(parent, x, y)
+        self.rights[y] = x
+        self.parents[x] = y
+        self.lefts[x] = b
+        if b != NIL:
+            self.parents[b] = x
+        self.__update_height(x)
+        self.__update_height(y)
+        return y
+
+    def rebalance(self, index: int):
+        """
+        Rebalances the tree from a slot upwards, stopping once a subtree keeps its height
+        Args:
+            index (int): The slot to start rebalancing from
+        """
+        heights = self.heights
+        while index != NIL:
+            old_height = heights[index]
+            self.__update_height(index)
+            balance = self.balance_factor(index)
+            # LL / LR
+            if balance > 1:
+                if self.balance_factor(self.lefts[index]) < 0:
+                    self.rotate_left(self.lefts[index])
+                index = self.rotate_right(index)
+            # RR / RL
+            elif balance < -1:
+                if self.balance_factor(self.rights[index]) > 0:
+                    self.rotate_right(self.rights[index])
+                index = self.rotate_left(index)
+            if heights[index] == old_height:
+                break
+            index = self.parents[index]
+
+    # ------------------------------------------------
+    # Mutation
+    # ------------------------------------------------
+
+    def insert(self, item) -> bool:
+        """
+        Adds a single item if it is not there yet, without touching the version
+        Returns:
+            bool: True if the item was added
+        """
+        key = self.key(item)
+        parent, found = self.locate(key)
+        if found:
+            return False
+        index = self.__alloc(key, item, parent)
+        if parent == NIL:
+            self.root_index = index
+        else:
+            if key < self.keys[parent]:
+                self.lefts[parent] = index
+            else:
+                self.rights[parent] = index
+            self.__resize_path(parent, 1)
+            self.rebalance(parent)
+        return True
+
+    def __del(self, index: int):
+        left = self.lefts[index]
+        right = self.rights[index]
+        # pass the headache to the successor
+        if left != NIL and right != NIL:
+            successor = right
+            while self.lefts[successor] != NIL:
+                successor = self.lefts[successor]
+            self.keys[index] = self.keys[successor]
+            self.values[index] = self.values[successor]
+            index = successor
+            left = NIL
+            right = self.rights[index]
+        # splice out a node with one child at most
+        child = left if left != NIL else right
+        parent = self.parents[index]
+        self.__replace_child(parent, index, child)
+        if child != NIL:
+            self.parents[child] = parent
+        self.__release(index)
+        self.__resize_path(parent, -1)
+        self.rebalance(parent)
+
+    def remove(self, item) -> bool:
+        """
+        Removes a single item if it is there, without touching the version
+        Returns:
+            bool: True if the item was removed
+        """
+        index, found = self.locate(self.key(item))
+        if found:
+            self.__del(index)
+        return found
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        """
+        Replace the tree contents with the given items, building a perfectly balanced tree in linear time.
+        Slots are laid out in key order, so in-order walks read the columns front to back.
+        Args:
+            iterable (Iterable): The items to load
+            presorted (bool, optional): Skip sorting when the items already come in ascending order
+        """
+        key = self.key
+        pairs = [(key(item), item) for item in iterable]
+        if not presorted:
+            pairs.sort(key=lambda pair: pair[0])
+        keys = array("q")
+        values = []
+        for k, item in pairs:
+            if not keys or k != keys[-1]:
+                keys.append(k)
+                values.append(item)
+        n = len(keys)
+        lefts = array("i", [NIL]) * n
+        rights = array("i", [NIL]) * n
+        parents = array("i", [NIL]) * n
+        heights = array("b", [1]) * n
+        sizes = array("i", [1]) * n
+
+        def _build(lo: int, hi: int, parent: int) -> int:
+            if lo >= hi:
+                return NIL
+            mid = (lo + hi) // 2
+            parents[mid] = parent
+            # a range split at its middle is as tall as its size has bits
+            heights[mid] = (hi - lo).bit_length()
+            sizes[mid] = hi - lo
+            lefts[mid] = _build(lo, mid, mid)
+            rights[mid] = _build(mid + 1, hi, mid)
+            return mid
+
+        self.clear()
+        self.keys, self.lefts, self.rights, self.parents, self.heights, self.sizes = keys, lefts, rights, parents, heights, sizes
+        self.values = values
+        self.root_index = _build(0, n, NIL)
+
+    # ------------------------------------------------
+    # Ordered queries
+    # ------------------------------------------------
+
+    def next_index(self, index: int) -> int:
+        """ Returns the slot after another one in in-order traversal, NIL past the end """
+        right = self.rights[index]
+        if right != NIL:
+            while self.lefts[right] != NIL:
+                right = self.lefts[right]
+            return right
+        parent = self.parents[index]
+        while parent != NIL and self.rights[parent] == index:
+            index = parent
+            parent = self.parents[index]
+        return parent
+
+    def prev_index(self, index: int) -> int:
+        """ Returns the slot before another one in in-order traversal, NIL before the start """
+        left = self.lefts[index]
+        if left != NIL:
+            while self.rights[left] != NIL:
+                left = self.rights[left]
+            return left
+        parent = self.parents[index]
+        while parent != NIL and self.lefts[parent] == index:
+            index = parent
+            parent = self.parents[index]
+        return parent
+
+    def __first_index(self) -> int:
+        index = self.root_index
+        while index != NIL and self.lefts[index] != NIL:
+            index = self.lefts[index]
+        return index
+
+    def __last_index(self) -> int:
+        index = self.root_index
+        while index != NIL and self.rights[index] != NIL:
+            index = self.rights[index]
+        return index
+
+    def __lower_index(self, key: int, inclusive: bool) -> int:
+        keys = self.keys
+        found = NIL
+        index = self.root_index
+        while index != NIL:
+            if (keys[index] < key) if inclusive else (keys[index] <= key):
+                index = self.rights[index]
+            else:
+                found = index
+                index = self.lefts[index]
+        return found
+
+    def __upper_index(self, key: int, inclusive: bool) -> int:
+        keys = self.keys
+        found = NIL
+        index = self.root_index
+        while index != NIL:
+            if (key < keys[index]) if inclusive else (key <= keys[index]):
+                index = self.lefts[index]
+            else:
+                found = index
+                index = self.rights[index]
+        return found
+
+    def __count_lower(self, key: int, inclusive: bool) -> int:
+        """ Counts the slots whose key is lower than key, or lower or equal if inclusive """
+        keys = self.keys
+        sizes = self.sizes
+        count = 0
+        index = self.root_index
+        while index != NIL:
+            if (keys[index] <= key) if inclusive else (keys[index] < key):
+                left = self.lefts[index]
+                count += 1 + (sizes[left] if left != NIL else 0)
+                index = self.rights[index]
+            else:
+                index = self.lefts[index]
+        return count
+
+    def rank(self, item) -> int:
+        """
+        Counts the values lower than item in O(log n), item doesn't need to be in the tree
+        Args:
+            item (Any): The item
+        Returns:
+            int: The amount of lower values, the index item has or would have in order
+        """
+        return self.__count_lower(self.key(item), False)
+
+    def select(self, k: int) -> Optional[ArrayNode]:
+        """
+        Returns the node holding the k-th lowest value in O(log n)
+        Args:
+            k (int): The index in order, starting at 0
+        Returns:
+            Optional[ArrayNode]: The node, or None if k is out of range
+        """
+        if k < 0 or k >= len(self):
+            return None
+        index = self.root_index
+        while True:
+            left = self.lefts[index]
+            left_size = self.sizes[left] if left != NIL else 0
+            if k < left_size:
+                index = left
+            elif k == left_size:
+                return ArrayNode(self, index)
+            else:
+                k -= left_size + 1
+                index = self.rights[index]
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        """
+        Counts the values between lo and hi in O(log n), without visiting them
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+        Returns:
+            int: The amount of values in range
+        """
+        high = len(self) if hi is None else self.__count_lower(self.key(hi), inclusive[1])
+        low = 0 if lo is None else self.__count_lower(self.key(lo), not inclusive[0])
+        return max(0, high - low)
+
+    def first(self) -> Optional[ArrayNode]:
+        """ Returns the node with the lowest value, or None if the tree is empty """
+        return self.node(self.__first_index())
+
+    def last(self) -> Optional[ArrayNode]:
+        """ Returns the node with the highest value, or None if the tree is empty """
+        return self.node(self.__last_index())
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[ArrayNode]:
+        """
+        Returns the first node whose value is greater or equal than item
+        Args:
+            item (Any): The bound
+            inclusive (bool, optional): If False, values equal to item are skipped
+        Returns:
+            Optional[ArrayNode]: The node, or None if every value is lower
+        """
+        return self.node(self.__lower_index(self.key(item), inclusive))
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[ArrayNode]:
+        """
+        Returns the last node whose value is lower or equal than item
+        Args:
+            item (Any): The bound
+            inclusive (bool, optional): If False, values equal to item are skipped
+        Returns:
+            Optional[ArrayNode]: The node, or None if every value is greater
+        """
+        return self.node(self.__upper_index(self.key(item), inclusive))
+
+    def __iindices(self, lo, hi, inclusive: tuple[bool, bool], reverse: bool):
+        keys = self.keys
+        lo_key = None if lo is None else self.key(lo)
+        hi_key = None if hi is None else self.key(hi)
+        if reverse:
+            index = self.__last_index() if hi is None else self.__upper_index(hi_key, inclusive[1])
+            while index != NIL:
+                if lo_key is not None and ((keys[index] < lo_key) if inclusive[0] else (keys[index] <= lo_key)):
+                    return
+                yield index
+                index = self.prev_index(index)
+        else:
+            index = self.__first_index() if lo is None else self.__lower_index(lo_key, inclusive[0])
+            while index != NIL:
+                if hi_key is not None and ((hi_key < keys[index]) if inclusive[1] else (hi_key <= keys[index])):
+                    return
+                yield index
+                index = self.next_index(index)
+
+    def irange(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """
+        Lazily yields the nodes whose keys lie between the keys of lo and hi, in order. See tree.Tree.irange.
+        The tree must not be modified while the generator is alive.
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+            reverse (bool, optional): Yield from hi down to lo
+        Yields:
+            ArrayNode: The nodes in range
+        """
+        for index in self.__iindices(lo, hi, inclusive, reverse):
+            yield ArrayNode(self, index)
+
+    def range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """
+        Lazily yields the values between lo and hi, in order. See irange for the details.
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+            reverse (bool, optional): Yield from hi down to lo
+        Yields:
+            Any: The values in range
+        """
+        values = self.values
+        for index in self.__iindices(lo, hi, inclusive, reverse):
+            yield values[index]
+
+    # ------------------------------------------------
+    # Traversals
+    # ------------------------------------------------
+
+    def LIR_list(self) -> list:
+        """
+        Returns the in-order traversal of the tree as a list
+        """
+        return list(self.range())
+
+    def ILR_list(self) -> list:
+        """
+        Returns the pre-order traversal of the tree as a list
+        """
+        arr = []
+        stack = [self.root_index] if self.root_index != NIL else []
+        while stack:
+            index = stack.pop()
+            arr.append(self.values[index])
+            if self.rights[index] != NIL:
+                stack.append(self.rights[index])
+            if self.lefts[index] != NIL:
+                stack.append(self.lefts[index])
+        return arr
+
+    def LRI_list(self) -> list:
+        """
+        Returns the post-order traversal of the tree as a list
+        """
+        # right-first pre-order, reversed
+        arr = []
+        stack = [self.root_index] if self.root_index != NIL else []
+        while stack:
+            index = stack.pop()
+            arr.append(self.values[index])
+            if self.lefts[index] != NIL:
+                stack.append(self.lefts[index])
+            if self.rights[index] != NIL:
+                stack.append(self.rights[index])
+        arr.reverse()
+        return arr
+
+    def BREADTH_list(self) -> list:
+        """
+        Returns the breadth-first traversal of the tree as a list
+        """
+        arr = []
+        queue = deque([self.root_index] if self.root_index != NIL else [])
+        while queue:
+            index = queue.popleft()
+            arr.append(self.values[index])
+            if self.lefts[index] != NIL:
+                queue.append(self.lefts[index])
+            if self.rights[index] != NIL:
+                queue.append(self.rights[index])
+        return arr
@@ -0,0 +1,477 @@
+"""
+Benchmarks for the game's hot paths.
+
+Run a suite from the command line, for example::
+
+    python bench.py bulk --sizes 1000 100000 1000000
+"""
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+import pygame
+
+import levelfile
+from arraytree import ArrayTree
+from orderedindex import BACKENDS, make_index
+from persistenttree import PersistentTree
+from point import Point, as_tuple, pack
+from tree import Tree, Node
+from viewport import Viewport
+
+# ------------------------------------------------
+# Helpers
+# ------------------------------------------------
+
+def timed(func, *args, **kwargs) -> float:
+    """
+    Runs a function once and measures it
+    Args:
+        func (callable): The function to run
+    Returns:
+        float: The elapsed time in seconds
+    """
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+def random_points(n: int, seed: int = 0) -> list[Point]:
+    """
+    Generates n distinct points spread like a long generated track
+    Args:
+        n (int): The amount of points
+        seed (int): The random seed
+    Returns:
+        list[Point]: The points, in random order
+    """
+    rng = random.Random(seed)
+    keys = rng.sample(range(n * 16), n)
+    return [Point(k // 8, 40 + k % 8 * 16) for k in keys]
+
+def report(title: str, header: list[str], rows: list[list]):
+    """ Prints a small aligned table """
+    print(f"\n{title}")
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(str(cell).rjust(width) for cell, width in zip(row, widths)))
+
+class LegacyTree(Tree):
+    """ The original tree: recursive rebalance up to the root and repeated comparator calls, kept as a baseline """
+
+    def search_closer(self, item, cmp_func = None):
+        if self.root == None:
+            return (None, False)
+        node = self.root
+        while node != None:
+            if (item == node.value):
+                return (node, True)
+            elif (item < node.value and node.left != None):
+                node = node.left
+            elif (item > node.value and node.right != None):
+                node = node.right
+            else:
+                return (node, False)
+        return (None, False)
+
+    def rebalance(self, node: Node):
+        if node == None:
+            return
+        node.update_height()
+        balance = node.balance_factor()
+        if balance > 1 and node.left.balance_factor() >= 0:
+            node = self.rotate_right(node)
+        elif balance < -1 and node.right.balance_factor() <= 0:
+            node = self.rotate_left(node)
+        elif balance > 1 and node.left.balance_factor() < 0:
+            self.rotate_left(node.left)
+            node = self.rotate_right(node)
+        elif balance < -1 and node.right.balance_factor() > 0:
+            self.rotate_right(node.right)
+            node = self.rotate_left(node)
+        self.rebalance(node.parent)
+
+# ------------------------------------------------
+# Suites
+# ------------------------------------------------
+
+def bench_bulk(sizes: list[int]):
+    """ Per-item add versus bulk loading, the level loading path """
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        def _add_each():
+            tree = Tree()
+            for point in points:
+                tree.add(point)
+        add_t = timed(_add_each)
+        bulk_t = timed(Tree().bulk_load, points)
+        # a saved level comes back in its exact shape
+        saved = Tree()
+        for point in points:
+            saved.add(point)
+        restore_t = timed(Tree().restore, saved.LIR_list(), saved.shape())
+        rows.append([n, f"{add_t:.3f}s", f"{bulk_t:.3f}s", f"{restore_t:.3f}s", f"{add_t / bulk_t:.1f}x"])
+    report("Tree construction", ["n", "add", "bulk_load", "restore", "speedup"], rows)
+
+def bench_tree_ops(sizes: list[int]):
+    """ Insert, search and delete throughput, the editor's hot path """
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        probes = random_points(n, seed=1)
+        for name, cls in (("legacy", LegacyTree), ("current", Tree)):
+            tree = cls()
+            insert_t = timed(lambda: [tree.add(point) for point in points])
+            search_t = timed(lambda: [tree.search(point) for point in probes])
+            delete_t = timed(lambda: [tree.delete(point) for point in points])
+            rows.append([n, name] + [f"{n / t / 1000:.0f}k/s" for t in (insert_t, search_t, delete_t)])
+    report("Tree operations", ["n", "tree", "insert", "search", "delete"], rows)
+
+def bench_keys(sizes: list[int]):
+    """ Tree comparing Points, versus precomputed tuple keys and packed int keys """
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        probes = random_points(n, seed=1)
+        for name, key in (("Point", None), ("tuple", as_tuple), ("packed int", pack)):
+            tree = Tree(key=key)
+            insert_t = timed(lambda: [tree.add(point) for point in points])
+            search_t = timed(lambda: [tree.search(point) for point in probes])
+            rows.append([n, name] + [f"{n / t / 1000:.0f}k/s" for t in (insert_t, search_t)])
+    report("Tree keys", ["n", "key", "insert", "search"], rows)
+
+def bench_arraytree(sizes: list[int]):
+    """ Pointer-based tree versus the array-backed one: memory per node and operation throughput """
+    import tracemalloc
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        probes = random_points(n, seed=1)
+        for name, make in (("pointer", Tree), ("array", lambda: ArrayTree(key=pack))):
+            # the points exist beforehand, only the tree structure is measured
+            tracemalloc.start()
+            tree = make()
+            tree.bulk_load(points)
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            tree = make()
+            insert_t = timed(lambda: [tree.add(point) for point in points])
+            search_t = timed(lambda: [tree.search(point) for point in probes])
+            scan_t = timed(lambda: sum(1 for _ in tree.range()))
+            delete_t = timed(lambda: [tree.delete(point) for point in points])
+            rows.append([n, name, f"{size / n:.0f}B"] + [f"{n / t / 1000:.0f}k/s" for t in (insert_t, search_t, scan_t, delete_t)])
+    report("Tree storage", ["n", "tree", "per node", "insert", "search", "scan", "delete"], rows)
+
+def bench_traversals(sizes: list[int]):
+    """ Materialized traversals, first call versus the cached repeat, and a lazy partial walk """
+    rows = []
+    for n in sizes:
+        tree = Tree()
+        tree.bulk_load(random_points(n))
+        for name in ("LIR", "ILR", "LRI", "BREADTH"):
+            materialize = getattr(tree, f"{name}_list")
+            first_t = timed(materialize)
+            cached_t = timed(materialize)
+            # the draw loop only needs the first few values of a traversal
+            lazy_t = timed(lambda: [value for _, value in zip(range(100), getattr(tree, f"{name}_iter")())])
+            rows.append([n, name, f"{first_t * 1e3:.1f}ms", f"{cached_t * 1e3:.2f}ms", f"{lazy_t * 1e6:.0f}us"])
+    report("Traversals", ["n", "order", "first list", "cached list", "100 lazy"], rows)
+
+def bench_stats(sizes: list[int]):
+    """ HUD counters per frame on every index backend: order statistics versus walking the in-order list """
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        rng = random.Random(5)
+        positions = [rng.randrange(n * 2) for _ in range(1_000)]
+        # the walk is far too slow to repeat as many times
+        walked = positions[:20]
+        for backend in BACKENDS:
+            tree = make_index(backend, key=as_tuple)
+            tree.bulk_load(points)
+            def _walk():
+                for x in walked:
+                    values = tree.LIR_list()
+                    passed = sum(1 for value in values if value.x < x)
+                    density = sum(1 for value in values if x <= value.x < x + 96)
+            def _counted():
+                for x in positions:
+                    passed = tree.rank(Point(x, -math.inf))
+                    density = tree.count_range(Point(x, -math.inf), Point(x + 96, -math.inf), inclusive=(True, False))
+            walk_t = timed(_walk)
+            count_t = timed(_counted)
+            rows.append([n, backend, f"{walk_t / len(walked) * 1e6:.0f}us", f"{count_t / len(positions) * 1e6:.1f}us"])
+    report("HUD counters (per frame)", ["n", "backend", "LIR_list walk", "rank + count_range"], rows)
+
+def bench_interval(sizes: list[int]):
+    """ Exact interval query versus a key range widened by the widest obstacle, on dense levels """
+    widths = (16, 24, 64, 32)
+    extent = lambda point: point.x + widths[point.y % 4]
+    rows = []
+    for n in sizes:
+        tree = Tree(extent=extent)
+        tree.bulk_load(random_points(n))
+        rng = random.Random(2)
+        windows = [rng.randrange(n * 2) for _ in range(2_000)]
+        def _overlapping():
+            for left in windows:
+                for _ in tree.overlapping(left, Point(left + 138, math.inf)):
+                    pass
+        def _widened():
+            for left in windows:
+                for point in tree.range(Point(left - max(widths), -math.inf), Point(left + 138, math.inf)):
+                    if extent(point) >= left:
+                        pass
+        over_t = timed(_overlapping)
+        wide_t = timed(_widened)
+        rows.append([n, f"{over_t / len(windows) * 1e6:.0f}us", f"{wide_t / len(windows) * 1e6:.0f}us"])
+    report("Visible obstacles query (per screen)", ["n", "overlapping", "widened range"], rows)
+
+def bench_backends(sizes: list[int]):
+    """ Every index backend under the game's access pattern: level load, per-frame scans and editor edits """
+    widths = (16, 24, 64, 32)
+    extent = lambda point: point.x + widths[point.y % 4]
+    lo_key = lambda x: Point(x - max(widths), -math.inf)
+    rows = []
+    winners = []
+    for n in sizes:
+        points = random_points(n)
+        rng = random.Random(4)
+        start = rng.randrange(n * 2)
+        edits = [Point(rng.randrange(n * 2), 40 + rng.randrange(8) * 16) for _ in range(2_000)]
+        frames = 2_000
+        times = {}
+        for backend in BACKENDS:
+            index = make_index(backend, extent=extent, lo_key=lo_key)
+            load_t = timed(index.bulk_load, points)
+            viewport = Viewport(index)
+            def _frames():
+                # the camera scrolls like in play mode, the mouse hovers the middle of the screen
+                for frame in range(frames):
+                    left = start + frame * 5
+                    viewport.move(Point(left - max(widths), -math.inf), Point(left + 138, math.inf))
+                    for point in viewport:
+                        if extent(point) >= left:
+                            pass
+                    for _ in index.overlapping(left + 68, Point(left + 70, math.inf)):
+                        pass
+            def _edits():
+                for i, point in enumerate(edits):
+                    if i % 2:
+                        index.delete(point)
+                    else:
+                        index.add(point)
+            times[backend] = (load_t, timed(_frames) / frames, timed(_edits) / len(edits))
+            rows.append([n, backend, f"{load_t:.3f}s", f"{times[backend][1] * 1e6:.0f}us", f"{times[backend][2] * 1e6:.1f}us"])
+        winners.append([n] + [min(BACKENDS, key=lambda backend: times[backend][column]) for column in range(3)])
+    report("Index backends", ["n", "backend", "load", "per frame", "per edit"], rows)
+    report("Fastest backend", ["n", "load", "frames", "edits"], winners)
+
+def bench_levels(sizes: list[int]):
+    """ JSON versus binary level files: size on disk, save and load times """
+    # the level code needs pygame and a display, only set them up when this suite runs
+    import simulate
+    from obstacle import obstacle_point_from_index
+    game = simulate.game
+    simulate.init()
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            game.tree.bulk_load(obstacle_point_from_index(point.y % 4, point.x, point.y) for point in random_points(n))
+            for extension in (".json", levelfile.EXTENSION):
+                path = os.path.join(directory, f"level{extension}")
+                save_t = timed(game.save_level, path)
+                load_t = timed(game.load_level, path)
+                rows.append([n, extension, f"{os.path.getsize(path) / 1024:.0f}KiB", f"{save_t:.3f}s", f"{load_t:.3f}s"])
+    report("Level files", ["n", "format", "size", "save", "load"], rows)
+
+def draw_frames(frames: int, before_frame = None) -> float:
+    """
+    Times game.draw on an offscreen surface, alternating the editing and playing screens
+    Args:
+        frames (int): The frames to draw
+        before_frame (callable, optional): Runs untimed before each frame
+    Returns:
+        float: The mean time per frame in seconds
+    """
+    import simulate
+    game = simulate.game
+    simulate.init()
+    surface = pygame.Surface((simulate.SCREEN_WIDTH, simulate.SCREEN_HEIGHT))
+    total = 0
+    for frame in range(frames):
+        game.game_state = game.State.EDITING if frame // 100 % 2 == 0 else game.State.PLAYING
+        if before_frame is not None:
+            before_frame()
+        total += timed(game.draw, surface)
+    return total / frames
+
+def bench_text(sizes: list[int]):
+    """ Per-frame draw time with and without the text render cache """
+    import simulate
+    import res
+    uncached_t = draw_frames(1_000, res.render_text.cache_clear)
+    cached_t = draw_frames(1_000)
+    report("Draw time per frame", ["text", "frame"], [["rasterized", f"{uncached_t * 1e6:.0f}us"], ["cached", f"{cached_t * 1e6:.0f}us"]])
+
+def bench_road(sizes: list[int]):
+    """ Road and background drawing, chunk by chunk versus the cached layers, at several screen widths """
+    import simulate
+    import res
+    from road import Road
+    def _draw_chunks(road: Road, screen: pygame.Surface):
+        screen.blit(res.Image.BG.value, (0, 24))
+        for i in range(-1, road.screen_width // road.rect.w + 1):
+            screen.blit(road.image, (int(-road.offset) % int(road.rect.w) + i * int(road.rect.w), road.rect.y))
+        screen.blit(road.goal_image, (-road.offset + road.length * road.rect.w, road.rect.y))
+        screen.blit(road.goal_image, (-road.offset, road.rect.y))
+    rows = []
+    for width in (138, 640, 1920):
+        screen = pygame.Surface((width, simulate.SCREEN_HEIGHT))
+        road = Road(screen_width=width, length=200, background=res.Image.BG.value, background_pos=(0, 24))
+        times = []
+        for draw in (_draw_chunks, Road.draw):
+            def _frames():
+                for frame in range(1_000):
+                    road.offset = frame * 5
+                    draw(road, screen)
+            times.append(timed(_frames) / 1_000)
+        rows.append([width, width // road.rect.w + 1] + [f"{t * 1e6:.0f}us" for t in times])
+    report("Road draw per frame", ["width", "chunks", "per chunk", "layers"], rows)
+
+def bench_sprites(sizes: list[int]):
+    """ Obstacle pass on a dense screen, one blit and one Rect per obstacle versus the batched pass """
+    import simulate
+    from obstacle import obstacle_point_from_index
+    game = simulate.game
+    simulate.init()
+    surface = pygame.Surface((simulate.SCREEN_WIDTH, simulate.SCREEN_HEIGHT))
+    def _draw_each():
+        for object in game.visible_obstacles():
+            rect = pygame.Rect(object.x - game.road.offset, object.y, object.width, object.height)
+            if game.point_inside_rect(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1], rect):
+                pygame.draw.rect(surface, "white", rect)
+            surface.blit(object.image, rect)
+    rows = []
+    game.game_state = game.State.EDITING
+    game.road.offset = 0
+    for n in (100, 300, 1_000):
+        rng = random.Random(3)
+        game.tree.bulk_load(obstacle_point_from_index(rng.randrange(4), rng.randrange(simulate.SCREEN_WIDTH), rng.randrange(60, 170)) for _ in range(n))
+        visible = sum(1 for _ in game.visible_obstacles())
+        each_t = timed(lambda: [_draw_each() for _ in range(200)]) / 200
+        batch_t = timed(lambda: [(game.draw_editor_marks(surface, game.get_editor_marks()), game.draw_obstacles(surface)) for _ in range(200)]) / 200
+        rows.append([visible, f"{each_t * 1e6:.0f}us", f"{batch_t * 1e6:.0f}us"])
+    report("Obstacle pass per frame", ["on screen", "per obstacle", "batched"], rows)
+
+def bench_memory(sizes: list[int]):
+    """ Memory held by a loaded level, one sprite per obstacle versus the flyweight points """
+    import tracemalloc
+    import simulate
+    from obstacle import obstacle_registry, obstacle_point_from_index
+    simulate.init()
+    def _sprites(points):
+        # the previous storage: every point kept its own Sprite, image and Rect alive
+        sprites = [obstacle_registry[p.y % 4].constructor(p.x, p.y) for p in points]
+        return (Tree.from_sorted(Point(p.x, p.y) for p in points), sprites)
+    def _flyweights(points):
+        return Tree.from_sorted(obstacle_point_from_index(p.y % 4, p.x, p.y) for p in points)
+    rows = []
+    for n in sizes:
+        points = sorted(random_points(n))
+        row = [n]
+        for build in (_sprites, _flyweights):
+            tracemalloc.start()
+            start = time.perf_counter()
+            level = build(points)
+            elapsed = time.perf_counter() - start
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            row += [f"{size / n:.0f}B", f"{elapsed:.3f}s"]
+            del level
+        rows.append(row)
+    report("Obstacle storage (tree included)", ["n", "sprite / obstacle", "sprite load", "flyweight / obstacle", "flyweight load"], rows)
+
+def bench_regions(sizes: list[int]):
+    """ Cutting a stretch of road out of a level: split and join versus one delete per obstacle """
+    rows = []
+    for n in sizes:
+        points = sorted(random_points(n))
+        for stretch in (0.001, 0.1):
+            # the stretch starts at the middle of the level
+            lo = points[n // 2]
+            hi = points[min(n - 1, n // 2 + max(1, int(n * stretch)))]
+            tree = Tree(key=as_tuple)
+            tree.bulk_load(points, presorted=True)
+            def _split():
+                region = tree.split(lo)
+                tree.join(region.split(hi, inclusive=False))
+                return region
+            split_t = timed(_split)
+            tree = Tree(key=as_tuple)
+            tree.bulk_load(points, presorted=True)
+            doomed = list(tree.range(lo, hi))
+            delete_t = timed(tree.delete, *doomed)
+            rows.append([n, len(doomed), f"{split_t * 1e3:.2f}ms", f"{delete_t * 1e3:.2f}ms", f"{delete_t / split_t:.1f}x"])
+    report("Region cut", ["n", "k", "split/join", "deletes", "speedup"], rows)
+
+def bench_persistent(sizes: list[int]):
+    """ Editor undo on the persistent tree: memory kept per edit, undo and redo latency, against copying the level per edit """
+    import tracemalloc
+    edits = 1_000
+    rows = []
+    for n in sizes:
+        points = random_points(n)
+        tree = PersistentTree(key=as_tuple)
+        tree.bulk_load(points)
+        # half adds of new points, half deletes of loaded ones
+        fresh = [Point(point.x, point.y + 1) for point in random_points(edits // 2, seed=1)]
+        doomed = random.Random(2).sample(points, edits // 2)
+        tracemalloc.start()
+        start = time.perf_counter()
+        for added, deleted in zip(fresh, doomed):
+            tree.add(added)
+            tree.delete(deleted)
+        edit_t = time.perf_counter() - start
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        undo_t = timed(lambda: [tree.undo() for _ in range(edits)])
+        redo_t = timed(lambda: [tree.redo() for _ in range(edits)])
+        # the undo this replaces: a copy of the level before every edit
+        copy_t = timed(tree.LIR_list)
+        rows.append([n, f"{size / edits:.0f}B", f"{edit_t / edits * 1e6:.1f}us", f"{undo_t / edits * 1e6:.2f}us",
+                     f"{redo_t / edits * 1e6:.2f}us", f"{copy_t * 1e3:.1f}ms"])
+    report("Persistent tree", ["n", "memory / edit", "edit", "undo", "redo", "copy / edit"], rows)
+
+SUITES = {
+    "bulk": bench_bulk,
+    "ops": bench_tree_ops,
+    "keys": bench_keys,
+    "arraytree": bench_arraytree,
+    "interval": bench_interval,
+    "stats": bench_stats,
+    "traversals": bench_traversals,
+    "backends": bench_backends,
+    "levels": bench_levels,
+    "text": bench_text,
+    "road": bench_road,
+    "sprites": bench_sprites,
+    "memory": bench_memory,
+    "persistent": bench_persistent,
+    "regions": bench_regions,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("suite", choices=["all", *SUITES])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    for name, suite in SUITES.items():
+        if args.suite in ("all", name):
+            suite(args.sizes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+""" Module for an ordered index kept as a B+ tree with wide nodes """
+
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from orderedindex import OrderedIndex, sorted_unique
+
+class Leaf:
+    """ Bottom node of a BTree, a sorted run of values linked to its neighbouring leaves """
+    __slots__ = ("values", "next", "prev")
+
+    def __init__(self, values: list):
+        self.values = values
+        self.next: Optional["Leaf"] = None
+        self.prev: Optional["Leaf"] = None
+
+class Branch:
+    """
+    Inner node of a BTree.
+    keys[i] separates children[i] from children[i + 1]: every value under children[i + 1] is greater or equal than it,
+    every value under children[i] is lower. counts[i] is how many values there are under children[i].
+    """
+    __slots__ = ("keys", "children", "counts")
+
+    def __init__(self, keys: list, children: list, counts: list):
+        self.keys = keys
+        self.children = children
+        self.counts = counts
+
+def count(node) -> int:
+    """ Returns how many values there are under a node """
+    return len(node.values) if type(node) is Leaf else sum(node.counts)
+
+class BTreeCursor:
+    """ Cursor to a position of a BTree leaf """
+    __slots__ = ("leaf", "position")
+
+    def __init__(self, leaf: Leaf, position: int):
+        self.leaf = leaf
+        self.position = position
+
+    @property
+    def value(self):
+        return self.leaf.values[self.position]
+
+    def next(self) -> Optional["BTreeCursor"]:
+        """ Returns the cursor to the next value """
+        if self.position + 1 < len(self.leaf.values):
+            return BTreeCursor(self.leaf, self.position + 1)
+        if self.leaf.next is not None:
+            return BTreeCursor(self.leaf.next, 0)
+        return None
+
+    def prev(self) -> Optional["BTreeCursor"]:
+        """ Returns the cursor to the previous value """
+        if self.position > 0:
+            return BTreeCursor(self.leaf, self.position - 1)
+        if self.leaf.prev is not None:
+            return BTreeCursor(self.leaf.prev, len(self.leaf.prev.values) - 1)
+        return None
+
+    def __eq__(self, other):
+        return isinstance(other, BTreeCursor) and self.leaf is other.leaf and self.position == other.position
+
+    def __hash__(self):
+        return hash((id(self.leaf), self.position))
+
+class BTree(OrderedIndex):
+    """
+    Ordered index kept as a B+ tree: values live in wide sorted leaves chained together,
+    inner nodes only route the searches with bisect.
+    A level of the tree costs one bisect over a Python list, so lookups touch a few nodes instead of
+    a few dozens, and ordered scans walk whole leaves.
+    Deletions drop emptied nodes but never merge underfull ones, the height only depends on the largest
+    size the tree ever had.
+    Branches count the values under each child, so rank, select and counts add them up in O(log n).
+    """
+    # Most values per leaf, and most children per branch
+    order: int = 64
+
+    def __init__(self, extent = None, lo_key = None, order = None):
+        """
+        Args:
+            extent (callable, optional): See orderedindex.OrderedIndex
+            lo_key (callable, optional): See orderedindex.OrderedIndex
+            order (int, optional): Overrides the node width
+        """
+        super().__init__(extent, lo_key)
+        if order is not None:
+            self.order = order
+        self.clear()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def clear(self):
+        self.root = Leaf([])
+        self.length = 0
+        self.version += 1
+
+    def __descend(self, item) -> tuple[list[tuple[Branch, int]], Leaf]:
+        """ Walks down to the leaf whose range holds item, returns the branches crossed with the child taken """
+        path = []
+        node = self.root
+        while type(node) is Branch:
+            i = bisect_right(node.keys, item)
+            path.append((node, i))
+            node = node.children[i]
+        return (path, node)
+
+    def insert(self, item) -> bool:
+        path, leaf = self.__descend(item)
+        values = leaf.values
+        i = bisect_left(values, item)
+        if i < len(values) and values[i] == item:
+            return False
+        values.insert(i, item)
+        self.length += 1
+        for branch, child in path:
+            branch.counts[child] += 1
+        if len(values) > self.order:
+            self.__split(path, leaf)
+        return True
+
+    def __split(self, path: list[tuple[Branch, int]], leaf: Leaf):
+        mid = len(leaf.values) // 2
+        right = Leaf(leaf.values[mid:])
+        leaf.values = leaf.values[:mid]
+        right.next = leaf.next
+        right.prev = leaf
+        if leaf.next is not None:
+            leaf.next.prev = right
+        leaf.next = right
+        key = right.values[0]
+        left = leaf
+        # push the new node up, splitting every branch that overflows
+        while path:
+            branch, i = path.pop()
+            branch.keys.insert(i, key)
+            branch.children.insert(i + 1, right)
+            branch.counts[i] = count(left)
+            branch.counts.insert(i + 1, count(right))
+            if len(branch.children) <= self.order:
+                return
+            mid = len(branch.children) // 2
+            key = branch.keys[mid - 1]
+            right = Branch(branch.keys[mid:], branch.children[mid:], branch.counts[mid:])
+            branch.keys = branch.keys[:mid - 1]
+            branch.children = branch.children[:mid]
+            branch.counts = branch.counts[:mid]
+            left = branch
+        self.root = Branch([key], [left, right], [count(left), count(right)])
+
+    def remove(self, item) -> bool:
+        path, leaf = self.__descend(item)
+        values = leaf.values
+        i = bisect_left(values, item)
+        if i == len(values) or not values[i] == item:
+            return False
+        del values[i]
+        self.length -= 1
+        for branch, child in path:
+            branch.counts[child] -= 1
+        if not values and path:
+            if leaf.prev is not None:
+                leaf.prev.next = leaf.next
+            if leaf.next is not None:
+                leaf.next.prev = leaf.prev
+            # drop the emptied node, and every branch left without children
+            while path:
+                branch, i = path.pop()
+                del branch.children[i]
+                del branch.counts[i]
+                if branch.keys:
+                    del branch.keys[i - 1 if i > 0 else 0]
+                if branch.children:
+                    break
+            while type(self.root) is Branch and len(self.root.children) == 1:
+                self.root = self.root.children[0]
+        return True
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[BTreeCursor]:
+        _, leaf = self.__descend(item)
+        position = bisect_left(leaf.values, item) if inclusive else bisect_right(leaf.values, item)
+        if position == len(leaf.values):
+            # everything in this leaf is lower, the next one starts past item
+            if leaf.next is None:
+                return None
+            return BTreeCursor(leaf.next, 0)
+        return BTreeCursor(leaf, position)
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[BTreeCursor]:
+        _, leaf = self.__descend(item)
+        position = (bisect_right(leaf.values, item) if inclusive else bisect_left(leaf.values, item)) - 1
+        if position < 0:
+            if leaf.prev is None:
+                return None
+            return BTreeCursor(leaf.prev, len(leaf.prev.values) - 1)
+        return BTreeCursor(leaf, position)
+
+    def first(self) -> Optional[BTreeCursor]:
+        node = self.root
+        while type(node) is Branch:
+            node = node.children[0]
+        return BTreeCursor(node, 0) if node.values else None
+
+    def last(self) -> Optional[BTreeCursor]:
+        node = self.root
+        while type(node) is Branch:
+            node = node.children[-1]
+        return BTreeCursor(node, len(node.values) - 1) if node.values else None
+
+    def __count_lower(self, item, inclusive: bool) -> int:
+        """ Counts the values lower than item, or lower or equal if inclusive """
+        found = 0
+        node = self.root
+        while type(node) is Branch:
+            i = bisect_right(node.keys, item)
+            # every child before the one taken only holds lower values
+            found += sum(node.counts[:i])
+            node = node.children[i]
+        return found + (bisect_right(node.values, item) if inclusive else bisect_left(node.values, item))
+
+    def rank(self, item) -> int:
+        return self.__count_lower(item, False)
+
+    def select(self, k: int) -> Optional[BTreeCursor]:
+        if not 0 <= k < self.length:
+            return None
+        node = self.root
+        while type(node) is Branch:
+            i = 0
+            while k >= node.counts[i]:
+                k -= node.counts[i]
+                i += 1
+            node = node.children[i]
+        return BTreeCursor(node, k)
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        stop = self.length if hi is None else self.__count_lower(hi, inclusive[1])
+        start = 0 if lo is None else self.__count_lower(lo, not inclusive[0])
+        return max(0, stop - start)
+
+    def range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """ Same as orderedindex.OrderedIndex.range, walking whole leaves at once """
+        if reverse:
+            yield from OrderedIndex.range(self, lo, hi, inclusive, reverse)
+            return
+        cursor = self.first() if lo is None else self.lower_bound(lo, inclusive[0])
+        if cursor is None:
+            return
+        leaf, position = cursor.leaf, cursor.position
+        while leaf is not None:
+            values = leaf.values
+            if hi is not None:
+                stop = bisect_right(values, hi, position) if inclusive[1] else bisect_left(values, hi, position)
+                yield from values[position:stop]
+                if stop < len(values):
+                    return
+            else:
+                yield from values[position:]
+            leaf = leaf.next
+            position = 0
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        items = sorted_unique(iterable, presorted)
+        self.clear()
+        if not items:
+            return
+        # leave some room in every node so the first inserts don't split right away
+        fill = max(2, self.order * 3 // 4)
+        nodes = []
+        counts = []
+        previous = None
+        for start in range(0, len(items), fill):
+            leaf = Leaf(items[start:start + fill])
+            leaf.prev = previous
+            if previous is not None:
+                previous.next = leaf
+            previous = leaf
+            nodes.append(leaf)
+            counts.append(len(leaf.values))
+        lows = [leaf.values[0] for leaf in nodes]
+        while len(nodes) > 1:
+            parents = []
+            parent_lows = []
+            parent_counts = []
+            for start in range(0, len(nodes), fill):
+                parents.append(Branch(lows[start + 1:start + fill], nodes[start:start + fill], counts[start:start + fill]))
+                parent_lows.append(lows[start])
+                parent_counts.append(sum(counts[start:start + fill]))
+            nodes = parents
+            lows = parent_lows
+            counts = parent_counts
+        self.root = nodes[0]
+        self.length = len(items)
@@ -0,0 +1,82 @@
+""" Module for indexing obstacle hitboxes by lane for fast player collision checks """
+
+from bisect import bisect_right
+from typing import Optional
+
+from point import Point
+from orderedindex import OrderedIndex
+
+class LaneIndex:
+    """
+    Obstacle hitboxes bucketed into horizontal bands one lane tall, each band sorted by x.
+    Hitboxes are stored in world space with their padding already applied, so probing a point
+    only compares a handful of numbers and never allocates.
+    The index follows the tree version and rebuilds itself lazily after the tree changes.
+    """
+    def __init__(self, tree: OrderedIndex, top: int, band_height: int, bands: int):
+        """
+        Args:
+            tree (OrderedIndex): The obstacle index
+            top (int): The y coordinate where the first band starts
+            band_height (int): The height of each band, usually the lane height
+            bands (int): The number of bands, points above or below them fall in the edge bands
+        """
+        self.tree = tree
+        self.top = top
+        self.band_height = band_height
+        self.bands = bands
+        self.version = -1
+        self.lefts: list[list[int]] = []
+        self.boxes: list[list[tuple[int, int, int, int, Point]]] = []
+        self.max_width = 0
+
+    def band_of(self, y) -> int:
+        """
+        Returns the band a y coordinate falls in
+        Args:
+            y (int): The y coordinate
+        Returns:
+            int: The band index, clamped to the existing bands
+        """
+        return min(self.bands - 1, max(0, int((y - self.top) // self.band_height)))
+
+    def rebuild(self):
+        """ Rebuilds every band from the tree """
+        boxes = [[] for _ in range(self.bands)]
+        max_width = 0
+        for point in self.tree.LIR_list():
+            left, top, right, bottom = point.get_hitbox()
+            max_width = max(max_width, right - left)
+            for band in range(self.band_of(top), self.band_of(bottom) + 1):
+                boxes[band].append((left, top, right, bottom, point))
+        for band in boxes:
+            band.sort(key=lambda box: box[0])
+        self.boxes = boxes
+        self.lefts = [[box[0] for box in band] for band in boxes]
+        self.max_width = max_width
+        self.version = self.tree.version
+
+    def hit(self, x, y) -> Optional[Point]:
+        """
+        Finds the obstacle whose hitbox contains a world space point
+        Args:
+            x (int): The x coordinate, in world space
+            y (int): The y coordinate
+        Returns:
+            Optional[Point]: The first obstacle in tree order containing the point, or None
+        """
+        if self.version != self.tree.version:
+            self.rebuild()
+        band = self.band_of(y)
+        boxes = self.boxes[band]
+        found = None
+        i = bisect_right(self.lefts[band], x) - 1
+        reach = x - self.max_width
+        while i >= 0:
+            left, top, right, bottom, point = boxes[i]
+            if left < reach:
+                break
+            if x <= right and top <= y <= bottom and (found is None or point < found):
+                found = point
+            i -= 1
+        return found
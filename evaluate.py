@@ -0,0 +1,88 @@
+"""
+Batch evaluation of a directory of levels.
+
+Every level is played headlessly with each strategy, spread over all CPU cores::
+
+    python evaluate.py levels/ --strategies always-jump dodge recorded --json
+
+The recorded strategy replays ``<level>.inputs.json`` when it sits next to the level.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+LEVEL_EXTENSIONS = (".json", ".lvl")
+RECORDING_SUFFIX = ".inputs.json"
+
+def find_levels(directory: str) -> list[str]:
+    """
+    Lists the level files in a directory
+    Args:
+        directory (str): The directory to scan
+    Returns:
+        list[str]: The level paths, sorted by name
+    """
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.endswith(LEVEL_EXTENSIONS) and not name.endswith(RECORDING_SUFFIX)
+    )
+
+def recording_of(level: str) -> str:
+    """ Returns where the recorded inputs of a level live """
+    return os.path.splitext(level)[0] + RECORDING_SUFFIX
+
+def evaluate(level: str, strategy: str, max_ticks: int) -> dict:
+    """
+    Plays one level with one strategy, runs inside the worker processes
+    Args:
+        level (str): The level file
+        strategy (str): A simulate.STRATEGIES name, or "recorded"
+        max_ticks (int): Give up after this many ticks
+    Returns:
+        dict: The simulation result, tagged with the strategy
+    """
+    # imported here so pygame only ever starts inside the workers
+    import simulate
+    if strategy == "recorded":
+        if not os.path.exists(recording_of(level)):
+            return {"level": level, "strategy": strategy, "outcome": "no recording"}
+        policy = simulate.scripted(simulate.load_inputs(recording_of(level)))
+    else:
+        policy = simulate.STRATEGIES[strategy]
+    result = simulate.run(level, policy, max_ticks)
+    result["strategy"] = strategy
+    return result
+
+def print_table(results: list[dict]):
+    """ Prints the results as an aligned table """
+    header = ["level", "strategy", "outcome", "hp", "completeness", "ticks"]
+    rows = [[str(result.get(column, "")) for column in header] for result in results]
+    widths = [max(len(cell) for cell in column) for column in zip(header, *rows)]
+    for row in [header] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("directory")
+    parser.add_argument("--strategies", nargs="+", default=["always-jump", "dodge", "recorded"])
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--max-ticks", type=int, default=100_000)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    # keep the pygame banner of every worker out of the report
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    tasks = [(level, strategy) for level in find_levels(args.directory) for strategy in args.strategies]
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(evaluate, level, strategy, args.max_ticks) for level, strategy in tasks]
+        results = [future.result() for future in futures]
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        print_table(results)
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,23 @@
 
 import pygame
 import json
-import tree
+import math
 import res
+import levelfile
+import journal
+import contextlib
 
-from tree import Node
+from typing import Any, Iterable, Optional
 from enum import Enum
+from orderedindex import OrderedIndex, make_index
 
 from road import Road
-from player import Player
+from player import Player, MAX_LANES
+from viewport import Viewport
+from collision import LaneIndex
 
-from point import Point
-from obstacle import obstacle_from_index, obstacle_texture_from_index, get_obstacle_types_count, obstacle_damage_from_index
+from point import Point, as_tuple
+from obstacle import obstacle_point_from_index, obstacle_texture_from_index, get_obstacle_types_count, obstacle_damage_from_index, get_obstacle_max_width, obstacle_right, obstacle_lo_key
 
 class State(Enum):
     """ Describes the current state of the game """
@@ -27,18 +33,45 @@ player_velocity: float = 5
 editing_scroll_velocity: float = 0
 framerate: int = 30
 dialog_timer:int = 0
+play_ticks: int = 0
 screen_width: int = 0
 screen_height: int = 0
 placeholder_texture_index: int = 0
 player_sprite = ""
 
-tree = tree.Tree()
+# The obstacle index backend picked by the level config, the one forced from the command line if any,
+# and the one tree is actually built with
+index_backend: str = "avl"
+index_backend_override: Optional[str] = None
+active_index_backend: str = index_backend
+
+tree: OrderedIndex = make_index(active_index_backend, key=as_tuple, extent=obstacle_right, lo_key=obstacle_lo_key)
+viewport = Viewport(tree)
+
+# The level file and the journal its editor edits are appended to, see start_autosave
+level_path: str = "data.json"
+edit_journal: Optional[journal.Journal] = None
+# The obstacles the level file holds while autosave runs, in tree order, only the compaction thread replaces them
+saved_obstacles: list[Point] = []
 
 focused_obj: Point = None
+# Editor region selection as world x bounds, the x it is being dragged from, and the last obstacles cut or copied
+selection: Optional[tuple[float, float]] = None
+selection_anchor: Optional[float] = None
+clipboard: list[Point] = []
+# Editor help page shown under the road, H flips it
+help_page: int = 0
+# Screen regions touched by the moving parts of the last frame, see draw
+dirty_rects: list[pygame.Rect] = []
+# What the last whole frame was drawn from, see needs_full_redraw
+drawn_offset: float = None
+drawn_state: State = None
+drawn_tree: OrderedIndex = None
+drawn_version: int = None
+drawn_help_page: int = None
 road: Road = None
 player: Player = None
-
-rendering_obstacle_list = []
+lanes: LaneIndex = None
 
 # ------------------------------------------------
 # State change funcs
@@ -54,11 +87,12 @@ def goto_edit():
 
 def goto_play():
     """ Change game to play mode """
-    global game_state, dialog_timer
+    global game_state, dialog_timer, play_ticks
     # --- Global decl end ---
     player.HP = player.max_HP
     road.offset = -100
     dialog_timer = 0
+    play_ticks = 0
     game_state = State.PLAYING
 
 def goto_win():
@@ -79,21 +113,44 @@ def goto_to_the_graveyard():
 # Init funcs
 # ------------------------------------------------
 
-def init(SCREEN_WIDTH: int, SCREEN_HEIGHT: int):
+def init(SCREEN_WIDTH: int, SCREEN_HEIGHT: int, path: str = "data.json"):
     """ 
-    Initialize the game's general variables 
+    Initialize the game's general variables and load a level
     Args:
         SCREEN_WIDTH (int): The width of the game window
         SCREEN_HEIGHT (int): The height of the game window
+        path (str): The level file, JSON or binary, see load_level
     """
-    global road, player, screen_width, screen_height
+    global road, player, lanes, screen_width, screen_height
     # --- Global decl end ---
-    road = Road(screen_width=SCREEN_WIDTH, length=5)
+    road = Road(screen_width=SCREEN_WIDTH, length=5, background=res.Image.BG.value, background_pos=(0, 24))
     player = Player(road=road)
     road.rect.y = (SCREEN_HEIGHT - road.rect.h) / 2
+    lanes = LaneIndex(tree, top=road.rect.y, band_height=player.rect.h, bands=MAX_LANES)
     screen_width = SCREEN_WIDTH
     screen_height = SCREEN_HEIGHT
-    load_json()
+    load_level(path)
+
+def set_index_backend(backend: str):
+    """ 
+    Moves the obstacles to another index backend, see orderedindex.BACKENDS
+    Args:
+        backend (str): The backend name
+    """
+    global tree, viewport, active_index_backend
+    # --- Global decl end ---
+    index = make_index(backend, key=as_tuple, extent=obstacle_right, lo_key=obstacle_lo_key)
+    index.bulk_load(tree.LIR_list(), presorted=True)
+    tree = index
+    active_index_backend = backend
+    viewport = Viewport(tree)
+    if lanes is not None:
+        lanes.tree = tree
+        lanes.version = -1
+
+def get_index_backend() -> str:
+    """ Returns the name of the index backend the current level should use """
+    return index_backend_override or index_backend
 
 # ------------------------------------------------
 # Main loop funcs
@@ -105,7 +162,7 @@ def event_update(event: pygame.event.Event):
     Args:
         event (pygame.event.Event): The event to process
     """
-    global placeholder_texture_index
+    global placeholder_texture_index, selection, selection_anchor, help_page
     # --- Global decl end ---
     if game_state == State.EDITING:
         if event.type == pygame.MOUSEWHEEL:
@@ -114,18 +171,48 @@ def event_update(event: pygame.event.Event):
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_e:
                 goto_play()
+            elif event.key == pygame.K_z:
+                undo_edit()
+            elif event.key == pygame.K_y:
+                redo_edit()
+            elif event.key == pygame.K_x:
+                cut_selection()
+            elif event.key == pygame.K_c:
+                copy_selection()
+            elif event.key == pygame.K_p:
+                paste_clipboard(get_mouse_world_x())
+            elif event.key == pygame.K_DELETE or event.key == pygame.K_BACKSPACE:
+                clear_selection()
+            elif event.key == pygame.K_h:
+                help_page = (help_page + 1) % 2
+            elif event.key == pygame.K_ESCAPE:
+                selection = None
+        elif event.type == pygame.MOUSEMOTION:
+            if selection_anchor is not None:
+                x = get_mouse_world_x()
+                selection = (min(selection_anchor, x), max(selection_anchor, x))
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1:
+                selection_anchor = None
         elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1 and focused_obj is None:
+            if event.button == 1 and pygame.key.get_mods() & pygame.KMOD_SHIFT:
+                selection_anchor = get_mouse_world_x()
+                selection = (selection_anchor, selection_anchor)
+            elif event.button == 1 and focused_obj is None:
                 pos = list(pygame.mouse.get_pos())
                 pos[0] += road.offset
-                obj = obstacle_from_index(placeholder_texture_index, pos[0], pos[1])
-                tree.add(obj.as_point())
+                point = obstacle_point_from_index(placeholder_texture_index, pos[0], pos[1])
+                tree.add(point)
+                if edit_journal is not None:
+                    edit_journal.add(point.x, point.y, point.type)
             elif event.button == 2:
                 placeholder_texture_index += 1
                 placeholder_texture_index %= get_obstacle_types_count()
             elif event.button == 3:
                 if focused_obj:
                     tree.delete(focused_obj)
+                    if edit_journal is not None:
+                        edit_journal.delete(focused_obj.x, focused_obj.y, focused_obj.type)
     elif game_state == State.PLAYING:
         if event.type == pygame.KEYDOWN:
             # Check for specific key presses
@@ -142,44 +229,91 @@ def event_update(event: pygame.event.Event):
             if event.button == 1:
                 goto_edit()
 
-def get_visible_obstacle_limits() -> tuple[Node, Node]:
+def undo_edit():
+    """ Undoes the last editor edit, on index backends keeping versions like persistenttree.PersistentTree """
+    if hasattr(tree, "undo"):
+        journal_changes(tree.undo(), undone=True)
+
+def redo_edit():
+    """ Applies again the last undone editor edit, see undo_edit """
+    if hasattr(tree, "redo"):
+        journal_changes(tree.redo(), undone=False)
+
+def journal_changes(changes: Optional[list[tuple[bool, Point]]], undone: bool):
     """ 
-    Get the visible obstacles edge nodes 
+    Journals the edits an undo or a redo made, see start_autosave
+    Args:
+        changes (Optional[list[tuple[bool, Point]]]): The changes returned by the index, in the order they were first made,
+            whether each was an add and the obstacle
+        undone (bool): Whether the changes were undone rather than redone
+    """
+    if changes is None or edit_journal is None:
+        return
+    # an undo takes them back last first
+    for added, point in (reversed(changes) if undone else changes):
+        if added != undone:
+            edit_journal.add(point.x, point.y, point.type)
+        else:
+            edit_journal.delete(point.x, point.y, point.type)
+
+def get_visible_range() -> tuple[Point, Point]:
+    """ 
+    Get the tree bounds that enclose every obstacle overlapping the screen.
+    The tree is keyed by the obstacles top-left corner, so the low bound is pulled back
+    by the widest obstacle to keep wide sprites from being culled while their tail is still visible.
     Returns:
-        (Point, Point): The low and high limit point associated nodes
-    """
-    def compare(x, y):
-        if x == y:
-            return 0
-        elif x > y:
-            return 1
-        return -1
-    
-    low_limit = tree.search_closer(None, lambda obj: compare(0, obj.obstacle.rect.right - road.offset))[0]
-    high_limit = tree.search_closer(None, lambda obj: compare(screen_width, obj.obstacle.rect.x - road.offset))[0]
+        (Point, Point): The inclusive low and high bounds
+    """
+    return (Point(road.offset - get_obstacle_max_width(), -math.inf), Point(road.offset + screen_width, math.inf))
 
+def visible_obstacles():
+    """ 
+    Lazily yields the obstacles overlapping the screen, in tree order
+    Yields:
+        Point: The visible obstacles points
+    """
+    viewport.move(*get_visible_range())
+    for point in viewport:
+        if point.right >= road.offset:
+            yield point
+
+def get_visible_obstacle_limits() -> tuple[Any, Any]:
+    """ 
+    Get the visible obstacles edge nodes 
+    Returns:
+        (Any, Any): The low and high limit cursors, tree.Node with the avl backend, None if nothing is visible
+    """
+    low_limit = high_limit = None
+    for node in tree.ioverlapping(road.offset, Point(road.offset + screen_width, math.inf)):
+        if low_limit is None:
+            low_limit = node
+        high_limit = node
     return (low_limit, high_limit)
 
-def load_visible_obstacles():
-    """ Loads the visible obstacles into the rendering list """
-    global rendering_obstacle_list
-    # --- Global decl end ---
-    low_limit, high_limit = get_visible_obstacle_limits()
-    rendering_obstacle_list = []
+def get_obstacle_progress() -> tuple[int, int]:
+    """ 
+    Counts the obstacles the player already left behind and the ones still ahead, without walking them
+    Returns:
+        (int, int): The obstacles starting behind the player, and the rest
+    """
+    passed = tree.rank(Point(road.offset + player.rect.x, -math.inf))
+    return (passed, len(tree) - passed)
 
-    # print(low_limit.value, high_limit.value)
-    while low_limit != None:
-        rendering_obstacle_list.append(low_limit.value)
-        if low_limit.value == high_limit.value or low_limit.value > high_limit.value:
-            break
-        low_limit = low_limit.next()
+def get_chunk_density(chunk: int) -> int:
+    """ 
+    Counts the obstacles starting inside a road chunk, without walking them
+    Args:
+        chunk (int): The chunk index, from the road start
+    Returns:
+        int: The amount of obstacles
+    """
+    chunk_w = road.rect.w
+    return tree.count_range(Point(chunk * chunk_w, -math.inf), Point((chunk + 1) * chunk_w, -math.inf), inclusive=(True, False))
 
 def update():
     """ Updates the main game's logic """
-    global rendering_obstacle_list, editing_scroll_velocity
+    global editing_scroll_velocity
     # --- Global decl end ---
-    load_visible_obstacles()
-
     keys = pygame.key.get_pressed()
     if game_state == State.EDITING:
         sub_vel = 0
@@ -188,6 +322,9 @@ def update():
         if keys[pygame.K_RIGHT] and road.offset < road.get_size() - screen_width:
             sub_vel = 3
         editing_scroll_velocity = (editing_scroll_velocity + player_velocity * sub_vel) / 2
+        # let the scroll come to a full stop, idle frames then keep the camera still
+        if abs(editing_scroll_velocity) < 0.01:
+            editing_scroll_velocity = 0
         road.offset += editing_scroll_velocity
     road.update()
     player.update()
@@ -198,108 +335,532 @@ def update():
             goto_to_the_graveyard()
         else:
             if not player.jumping:
-                for object in rendering_obstacle_list:
-                    object_rect = object.obstacle.rect
-                    padding = object.obstacle.hitbox_padding
-                    rect = pygame.Rect(object_rect.x - road.offset + padding[0], object_rect.y + padding[2], object_rect.w - padding[0] - padding[1], object_rect.h - padding[2] - padding[3])
-                    if point_inside_rect(player.rect.centerx, player.rect.bottom - 4, rect):
-                        player.damage(obstacle_damage_from_index(object.obstacle.type))
+                object = lanes.hit(player.rect.centerx + road.offset, player.rect.bottom - 4)
+                if object is not None:
+                    player.damage(obstacle_damage_from_index(object.type))
 
 def post_update():
     """ Update the game's logic for the frme end """
-    global dialog_timer
+    global dialog_timer, play_ticks
     # --- Global decl end ---
     if game_state == State.PLAYING:
         road.offset += player_velocity
+        play_ticks += 1
     elif game_state == State.WINNER or game_state == State.GAMEOVER:
         dialog_timer += 2
-
-def draw(surface: pygame.Surface):
-    """ Draws the game content to a surface """
-    global focused_obj, rendering_obstacle_list
+    if edit_journal is not None:
+        if edit_journal.error is not None:
+            print(f"Autosave failed, the edits stay in the journal: {edit_journal.error}")
+            edit_journal.error = None
+        if edit_journal.due():
+            edit_journal.compact(snapshot_level)
+
+def obstacles_at(x: int, y: int) -> list[Point]:
+    """ 
+    Finds the obstacles drawn under a screen point with a single query to the obstacle tree
+    Args:
+        x (int): The x coordinate, in screen space
+        y (int): The y coordinate
+    Returns:
+        list[Point]: The obstacles under the point, in tree order
+    """
+    world_x = x + road.offset
+    found = []
+    # sprites land on truncated screen positions, so look one pixel around
+    for object in tree.overlapping(world_x - 1, Point(world_x + 1, math.inf)):
+        left = int(object.x - road.offset)
+        if left <= x <= left + object.width and object.y <= y <= object.bottom:
+            found.append(object)
+    return found
+
+def get_editor_marks() -> list[tuple[pygame.Rect, Optional[pygame.Surface], int]]:
+    """ 
+    Lays out the editor marks drawn under the obstacles: the placeholder at the mouse, the selection outline
+    and the highlights of the obstacles under the mouse, the last of which becomes focused_obj
+    Returns:
+        list[tuple[pygame.Rect, Optional[pygame.Surface], int]]: The marks in drawing order, each one an area and
+            the image to blit there, or None for a white rectangle of the given outline width, 0 filling it
+    """
+    global focused_obj
     # --- Global decl end ---
-    surface.blit(res.Image.BG.value, (0,24))
-    road.draw(surface)
-
-    if game_state == State.EDITING and focused_obj is None:
-        surface.blit(obstacle_texture_from_index(placeholder_texture_index), pygame.mouse.get_pos())
-
-    focused_obj = None
+    marks = []
+    if game_state != State.EDITING:
+        focused_obj = None
+        return marks
+    mouse = pygame.mouse.get_pos()
+    if focused_obj is None:
+        image = obstacle_texture_from_index(placeholder_texture_index)
+        marks.append((image.get_rect(topleft=mouse), image, 0))
+    if selection is not None:
+        left = selection[0] - road.offset
+        marks.append((pygame.Rect(left, road.rect.y, selection[1] - left - road.offset + 1, road.rect.h), None, 1))
+    hovered = obstacles_at(*mouse)
+    for object in hovered:
+        marks.append((pygame.Rect(object.x - road.offset, object.y, object.width, object.height), None, 0))
+    focused_obj = hovered[-1] if hovered else None
+    return marks
+
+def draw_editor_marks(surface: pygame.Surface, marks: list[tuple[pygame.Rect, Optional[pygame.Surface], int]]) -> list[pygame.Rect]:
+    """ 
+    Draws the editor marks, see get_editor_marks
+    Args:
+        surface (pygame.Surface): The surface to draw on
+        marks (list[tuple[pygame.Rect, Optional[pygame.Surface], int]]): The marks
+    Returns:
+        list[pygame.Rect]: The regions drawn
+    """
+    drawn = []
+    for area, image, width in marks:
+        if image is not None:
+            drawn.append(surface.blit(image, area))
+        else:
+            drawn.append(pygame.draw.rect(surface, "white", area, width))
+    return drawn
 
-    for object in rendering_obstacle_list:
-        rect = pygame.Rect(object.obstacle.rect.x - road.offset, object.obstacle.rect.y, object.obstacle.rect.w, object.obstacle.rect.h)
-        if game_state == State.EDITING and point_inside_rect(pygame.mouse.get_pos()[0], pygame.mouse.get_pos()[1], rect):
-            focused_obj = object
-            pygame.draw.rect(surface, "white", rect)
-        surface.blit(object.obstacle.image, rect)
-    
-    player.draw(surface)
+def blit_inside(surface: pygame.Surface, sequence: list[tuple[pygame.Surface, tuple]], areas: list[pygame.Rect]):
+    """ 
+    Blits a sequence like Surface.blits does, but only inside some areas of the surface.
+    Every image is drawn with binary transparency, so a pixel covered by two areas can take the same blit twice.
+    Args:
+        surface (pygame.Surface): The surface to draw on
+        sequence (list[tuple[pygame.Surface, tuple]]): The images and their positions, in drawing order
+        areas (list[pygame.Rect]): The areas to redraw
+    """
+    for area in areas:
+        touching = [(image, position) for image, position in sequence if area.colliderect(image.get_rect(topleft=position))]
+        if touching:
+            surface.set_clip(area)
+            surface.blits(touching, doreturn=False)
+    surface.set_clip(None)
+
+def draw_obstacles(surface: pygame.Surface, areas: Optional[list[pygame.Rect]] = None):
+    """ 
+    Draws the visible obstacles in one batch
+    Args:
+        surface (pygame.Surface): The surface to draw on
+        areas (list[pygame.Rect], optional): Only draw inside these areas, see blit_inside
+    """
+    sprites = [(object.image, (object.x - road.offset, object.y)) for object in visible_obstacles()]
+    if areas is not None:
+        blit_inside(surface, sprites, areas)
+    elif hasattr(surface, "fblits"):
+        # pygame-ce only, skips building the rects nobody reads
+        surface.fblits(sprites)
+    else:
+        surface.blits(sprites, doreturn=False)
+
+def draw_overlay(surface: pygame.Surface) -> list[pygame.Rect]:
+    """ 
+    Draws what goes over the obstacles and moves on its own: the player, the HUD and the dialog
+    Args:
+        surface (pygame.Surface): The surface to draw on
+    Returns:
+        list[pygame.Rect]: The regions drawn
+    """
+    drawn = player.draw(surface)
     road_below_y = 0
-    surface.blit(res.Font.NJ.value.render(f"HP {player.HP} <{road.completeness}x>", False, (143, 98, 51)), (2, road_below_y))
+    drawn.append(surface.blit(res.render_text(f"HP {player.HP} <{road.completeness}x>", (143, 98, 51)), (2, road_below_y)))
+    if game_state == State.EDITING:
+        chunk = int((pygame.mouse.get_pos()[0] + road.offset) // road.rect.w)
+        drawn.append(surface.blit(res.render_text(f"Chunk {chunk}: {get_chunk_density(chunk)} obs", (143, 98, 51)), (2, road_below_y + 10)))
+    elif game_state == State.PLAYING:
+        passed, remaining = get_obstacle_progress()
+        drawn.append(surface.blit(res.render_text(f"{passed} passed {remaining} left", (143, 98, 51)), (2, road_below_y + 10)))
     dialog_aperture = min(24, dialog_timer)
-    pygame.draw.rect(surface, (56, 0, 15), (0, screen_height / 2 - dialog_aperture, screen_width, dialog_aperture * 2))
+    drawn.append(pygame.draw.rect(surface, (56, 0, 15), (0, screen_height / 2 - dialog_aperture, screen_width, dialog_aperture * 2)))
     if dialog_aperture == 24:
         if game_state == State.WINNER:
-            surface.blit(res.Image.WIN.value, (0, screen_height / 2 - 12))
+            drawn.append(surface.blit(res.Image.WIN.value, (0, screen_height / 2 - 12)))
         elif game_state == State.GAMEOVER:
-            surface.blit(res.Image.LOSE.value, (0, screen_height / 2 - 12))
-    
+            drawn.append(surface.blit(res.Image.LOSE.value, (0, screen_height / 2 - 12)))
+    return drawn
+
+def get_help_text() -> list[tuple[pygame.Surface, tuple]]:
+    """ 
+    Lays out the key help shown below the road
+    Returns:
+        list[tuple[pygame.Surface, tuple]]: The rendered lines and their positions
+    """
     road_below_y = road.rect.bottom
     if game_state == State.EDITING:
-        surface.blit(res.Font.NJ.value.render(f"L/R: Scroll", False, (143, 98, 51)), (0, road_below_y))
-        surface.blit(res.Font.NJ.value.render(f"Wheel: Change", False, (143, 98, 51)), (0, road_below_y + 10))
-        surface.blit(res.Font.NJ.value.render(f"LMB: Place", False, (143, 98, 51)), (0, road_below_y + 20))
-        surface.blit(res.Font.NJ.value.render(f"RMB: Delete", False, (143, 98, 51)), (0, road_below_y + 30))
-        surface.blit(res.Font.NJ.value.render(f"MMB: Change", False, (143, 98, 51)), (0, road_below_y + 40))
-        surface.blit(res.Font.NJ.value.render(f"E: Switch to play", False, (143, 98, 51)), (0, road_below_y + 50))
-        surface.blit(res.Font.NJ.value.render(f"V: See avl", False, (143, 98, 51)), (0, road_below_y + 60))
+        if help_page == 0:
+            lines = ["L/R: Scroll", "Wheel/MMB: Change", "LMB: Place", "RMB: Delete", "E: Switch to play", "V: See avl", "H: More keys"]
+        else:
+            lines = ["Shft+Drag: Select", "X: Cut  C: Copy", "P: Paste", "Del: Clear"]
+            if hasattr(tree, "undo"):
+                lines.append("Z/Y: Undo/Redo")
+            lines.append("H: Basic keys")
     elif game_state == State.PLAYING:
-        surface.blit(res.Font.NJ.value.render(f"E: Switch to edit", False, (143, 98, 51)), (0, road_below_y))
-        surface.blit(res.Font.NJ.value.render(f"Space/C/X: Jump", False, (143, 98, 51)), (0, road_below_y + 10))
-        surface.blit(res.Font.NJ.value.render(f"Up/Down: Dodge", False, (143, 98, 51)), (0, road_below_y + 20))
-        surface.blit(res.Font.NJ.value.render(f"V: See avl", False, (143, 98, 51)), (0, road_below_y + 30))
+        lines = ["E: Switch to edit", "Space/C/X: Jump", "Up/Down: Dodge", "V: See avl"]
+    else:
+        lines = []
+    return [(res.render_text(line, (143, 98, 51)), (0, road_below_y + i * 10)) for i, line in enumerate(lines)]
+
+def needs_full_redraw() -> bool:
+    """ Whether the camera, the state, the obstacles or the help page changed since the last whole frame, see draw_dirty """
+    return (road.offset != drawn_offset or game_state != drawn_state or tree is not drawn_tree or tree.version != drawn_version
+        or help_page != drawn_help_page)
+
+def draw(surface: pygame.Surface, ground: Optional[pygame.Surface] = None):
+    """ 
+    Draws the whole game content to a surface.
+    Besides drawing, it records in dirty_rects the regions covered by the parts of the frame that change
+    while the camera stands still (editor marks, player, HUD and dialog), for draw_dirty.
+    Args:
+        surface (pygame.Surface): The surface to draw on, already cleared
+        ground (pygame.Surface, optional): Receives a copy of the frame before anything but the road is drawn, for draw_dirty
+    """
+    global dirty_rects, drawn_offset, drawn_state, drawn_tree, drawn_version, drawn_help_page
+    # --- Global decl end ---
+    drawn_offset = road.offset
+    drawn_state = game_state
+    drawn_tree = tree
+    drawn_version = tree.version
+    drawn_help_page = help_page
+
+    road.draw(surface)
+    if ground is not None:
+        ground.blit(surface, (0, 0))
+    dirty = draw_editor_marks(surface, get_editor_marks())
+    draw_obstacles(surface)
+    dirty.extend(draw_overlay(surface))
+    surface.blits(get_help_text(), doreturn=False)
+    dirty_rects = dirty
+
+def draw_dirty(surface: pygame.Surface, ground: pygame.Surface, previous_rects: list[pygame.Rect]):
+    """ 
+    Redraws a surface holding the last frame, as long as needs_full_redraw is False.
+    The regions dirtied by the last frame and the new editor marks get their ground back from the copy draw took,
+    then the layers over them are drawn again inside those regions only, in the same order draw uses.
+    Args:
+        surface (pygame.Surface): The surface holding the last frame
+        ground (pygame.Surface): The ground copy filled by the last draw
+        previous_rects (list[pygame.Rect]): The dirty_rects of the last frame
+    """
+    global dirty_rects
+    # --- Global decl end ---
+    marks = get_editor_marks()
+    areas = previous_rects + [area for area, _, _ in marks]
+    for area in areas:
+        surface.blit(ground, area, area)
+    dirty = draw_editor_marks(surface, marks)
+    draw_obstacles(surface, areas)
+    overlay = draw_overlay(surface)
+    # the help text goes over everything else
+    blit_inside(surface, get_help_text(), areas + overlay)
+    dirty_rects = dirty + overlay
 
 
 # ------------------------------------------------
 # Save/Load funcs
 # ------------------------------------------------
 
-def load_json():
-    """ Load configurable data from disk """
-    # load atomic properties
-    global player_velocity, framerate, tree, player_sprite, player, tree, obstacle_damage
+def get_config() -> dict:
+    """ 
+    Get the level config block
+    Returns:
+        dict: The configurable properties of the level
+    """
+    return {
+        "road_length": road.length,
+        "player_velocity": player_velocity,
+        "framerate": framerate,
+        "jump_distance": player.jump_distance,
+        "player_sprite": player_sprite,
+        "index_backend": index_backend
+    }
+
+def apply_config(config: dict):
+    """ 
+    Apply a level config block
+    Args:
+        config (dict): The configurable properties of the level
+    """
+    global player_velocity, framerate, player_sprite, index_backend
     # --- Global decl end ---
-    with open('data.json', 'r') as file:
+    road.length = config["road_length"]
+    player_velocity = config["player_velocity"]
+    framerate = config["framerate"]
+    player.jump_distance = config["jump_distance"]
+    player_sprite = config["player_sprite"]
+    player.image = pygame.image.load( player_sprite ).convert_alpha()
+    index_backend = config.get("index_backend", "avl")
+    if get_index_backend() != active_index_backend:
+        set_index_backend(get_index_backend())
+
+def restore_obstacles(points, shape: bytes):
+    """
+    Fill the obstacle index from a saved level, in the exact tree shape it was saved with when possible
+    Args:
+        points (Iterable[ObstaclePoint]): The obstacles, in tree order
+        shape (bytes): The saved shape, see tree.Tree.shape, empty if the level has none
+    """
+    points = list(points)
+    if shape and hasattr(tree, "restore"):
+        try:
+            tree.restore(points, shape)
+            return
+        except ValueError as error:
+            # edited by hand or saved by an older version, rebuild it balanced instead
+            print(f"Ignoring the saved tree shape: {error}")
+    tree.bulk_load(points, presorted=True)
+
+def load_json(path: str = "data.json"):
+    """ 
+    Load configurable data from disk 
+    Args:
+        path (str): The level file to read
+    """
+    with open(path, 'r') as file:
         loaded_data = json.load(file)
-        road.length = loaded_data["config"]["road_length"]
-        player_velocity = loaded_data["config"]["player_velocity"]
-        framerate = loaded_data["config"]["framerate"]
-        player.jump_distance = loaded_data["config"]["jump_distance"]
-        player_sprite = loaded_data["config"]["player_sprite"]
-        player.image = pygame.image.load( player_sprite ).convert_alpha()
-        # load obstacles
-        tree.clear()
-        for obs in loaded_data["objects"]:
-            obstacle = obstacle_from_index(obs["type"], obs["x"], obs["y"])
-            tree.add(obstacle.as_point())
-        pass
-
-def save_json():
-    """ Save configurable data to disk """
-    global player_velocity, framerate, tree, player_sprite, player, tree, obstacle_damage
-    # --- Global decl end ---
-    with open('data.json', 'w') as file:
+    apply_config(loaded_data["config"])
+    # load obstacles
+    restore_obstacles(
+        (obstacle_point_from_index(obs["type"], obs["x"], obs["y"]) for obs in loaded_data["objects"]),
+        loaded_data.get("shape", "").encode("ascii"))
+
+def save_json(path: str = "data.json"):
+    """ 
+    Save configurable data to disk 
+    Args:
+        path (str): The level file to write
+    """
+    write_json(path, get_config(), tree.LIR_list(), get_tree_shape())
+
+def write_json(path: str, config: dict, points: Iterable, shape: bytes = b""):
+    """ 
+    Write a level to disk in the JSON format
+    Args:
+        path (str): The level file to write
+        config (dict): The level config block
+        points (Iterable[ObstaclePoint]): The obstacles, in tree order
+        shape (bytes, optional): The shape of the tree holding them, see tree.Tree.shape
+    """
+    with open(path, 'w') as file:
         json.dump({
-            "config": {
-                "road_length": road.length,
-                "player_velocity": player_velocity,
-                "framerate": framerate,
-                "jump_distance": player.jump_distance,
-                "player_sprite": player_sprite
-            },
-            "objects": [{ "x": obj.x, "y": obj.y, "type": obj.obstacle.type } for obj in tree.LIR_list()]
+            "config": config,
+            "objects": [{ "x": obj.x, "y": obj.y, "type": obj.type } for obj in points],
+            "shape": shape.decode("ascii")
         }, file, indent=4)
 
+def load_binary(path: str):
+    """ 
+    Load a level stored in the binary format, see levelfile
+    Args:
+        path (str): The level file to read
+    """
+    with levelfile.BinaryLevel(path) as level:
+        apply_config(level.config)
+        # records come in tree order already
+        restore_obstacles((obstacle_point_from_index(type, x, y) for x, y, type in level.records()), level.shape)
+
+def save_binary(path: str):
+    """ 
+    Save the level in the binary format, see levelfile
+    Args:
+        path (str): The level file to write
+    """
+    levelfile.write(path, get_config(), ((obj.x, obj.y, obj.type) for obj in tree.LIR_list()), get_tree_shape())
+
+def get_tree_shape() -> bytes:
+    """ Returns the shape of the obstacle tree, empty for index backends that can't restore one """
+    return tree.shape() if hasattr(tree, "restore") else b""
+
+def load_level(path: str = "data.json"):
+    """ 
+    Load a level, picking the format from the file extension
+    Args:
+        path (str): The level file to read
+    """
+    if levelfile.is_binary(path):
+        load_binary(path)
+    else:
+        load_json(path)
+
+def save_level(path: str = "data.json"):
+    """ 
+    Save a level, picking the format from the file extension
+    Args:
+        path (str): The level file to write
+    """
+    if levelfile.is_binary(path):
+        save_binary(path)
+    else:
+        save_json(path)
+
+# ------------------------------------------------
+# Region edits
+# ------------------------------------------------
+
+def get_mouse_world_x() -> int:
+    """ Returns the world x under the mouse """
+    return int(pygame.mouse.get_pos()[0] + road.offset)
+
+def region_edit():
+    """ 
+    Opens a region edit: on index backends keeping versions, every obstacle it moves is undone in a single step
+    Returns:
+        The context manager wrapping the edit
+    """
+    return tree.batch() if hasattr(tree, "batch") else contextlib.nullcontext()
+
+def take_region(lo_x: float, hi_x: float) -> list[Point]:
+    """ 
+    Removes the obstacles whose x lies in [lo_x, hi_x].
+    Trees with split and join cut the whole stretch out in O(log n), other index backends delete one by one.
+    Args:
+        lo_x (float): The lowest x
+        hi_x (float): The highest x
+    Returns:
+        list[Point]: The removed obstacles, in tree order
+    """
+    lo = Point(lo_x, -math.inf)
+    hi = Point(hi_x, math.inf)
+    if hasattr(tree, "split"):
+        region = tree.split(lo)
+        tree.join(region.split(hi, inclusive=False))
+        taken = region.LIR_list()
+    else:
+        taken = list(tree.range(lo, hi))
+        tree.delete(*taken)
+    if edit_journal is not None:
+        for point in taken:
+            edit_journal.delete(point.x, point.y, point.type)
+    return taken
+
+def put_region(points: list[Point]):
+    """ 
+    Adds a run of obstacles over a stretch of road with nothing on it, see take_region.
+    Trees with split and join build the run apart and splice it in, other index backends add one by one.
+    Args:
+        points (list[Point]): The obstacles, in tree order
+    """
+    if not points:
+        return
+    if hasattr(tree, "join"):
+        run = tree.spawn()
+        run.bulk_load(points, presorted=True)
+        right = tree.split(points[0])
+        tree.join(run)
+        tree.join(right)
+    else:
+        tree.add(*points)
+    if edit_journal is not None:
+        for point in points:
+            edit_journal.add(point.x, point.y, point.type)
+
+def cut_selection():
+    """ Moves the obstacles in the selected stretch of road to the clipboard """
+    global selection, clipboard
+    # --- Global decl end ---
+    if selection is not None:
+        with region_edit():
+            clipboard = take_region(*selection)
+        selection = None
+
+def copy_selection():
+    """ Copies the obstacles in the selected stretch of road to the clipboard """
+    global clipboard
+    # --- Global decl end ---
+    if selection is not None:
+        clipboard = list(tree.range(Point(selection[0], -math.inf), Point(selection[1], math.inf)))
+
+def clear_selection():
+    """ Removes the obstacles in the selected stretch of road """
+    global selection
+    # --- Global decl end ---
+    if selection is not None:
+        with region_edit():
+            take_region(*selection)
+        selection = None
+
+def paste_clipboard(x: int):
+    """ 
+    Pastes the clipboard with its first obstacle at x, replacing whatever the stretch it lands on held
+    Args:
+        x (int): The world x to paste at
+    """
+    if not clipboard:
+        return
+    offset = x - clipboard[0].x
+    shifted = [obstacle_point_from_index(point.type, point.x + offset, point.y) for point in clipboard]
+    with region_edit():
+        take_region(shifted[0].x, shifted[-1].x)
+        put_region(shifted)
+
+# ------------------------------------------------
+# Autosave
+# ------------------------------------------------
+
+def start_autosave(path: str = "data.json"):
+    """ 
+    Replays the editor edits journaled since the level was last saved whole, then journals the new ones.
+    Call it once the level is loaded.
+    Args:
+        path (str): The level file, as loaded
+    """
+    global level_path, edit_journal, saved_obstacles
+    # --- Global decl end ---
+    level_path = path
+    if journal.has_records(path):
+        replayed = journal.replay(path,
+            lambda x, y, type: tree.add(obstacle_point_from_index(type, x, y)),
+            lambda x, y, type: tree.delete(obstacle_point_from_index(type, x, y)))
+        print(f"Recovered {replayed} unsaved edits")
+        # fold them in right away, the journals start empty
+        save_level(path)
+        journal.discard(path)
+    saved_obstacles = tree.LIR_list()
+    edit_journal = journal.Journal(path, save=write_autosave)
+
+def stop_autosave():
+    """ Saves the whole level and drops the journal """
+    global edit_journal
+    # --- Global decl end ---
+    if edit_journal is not None:
+        edit_journal.close()
+        edit_journal = None
+    save_level(level_path)
+    journal.discard(level_path)
+
+def snapshot_level() -> tuple[dict, list[Point]]:
+    """ 
+    Takes what write_autosave needs to save the level on another thread, without walking the tree
+    Returns:
+        (dict, list[ObstaclePoint]): The config and the obstacles of the last snapshot
+    """
+    # no compaction is running, so saved_obstacles is settled
+    return (get_config(), saved_obstacles)
+
+def write_autosave(path: str, state: tuple[dict, list[Point]], records: list[tuple[bytes, int, int, int]]):
+    """ 
+    Writes a level snapshot on the compaction thread: the journaled edits folded into the previous snapshot.
+    Autosaved levels carry no tree shape, they load balanced, stop_autosave saves the exact tree.
+    Args:
+        path (str): The level file to write
+        state (tuple[dict, list[ObstaclePoint]]): The copy taken by snapshot_level
+        records (list[tuple[bytes, int, int, int]]): The journal records to fold in
+    """
+    global saved_obstacles
+    # --- Global decl end ---
+    config, points = state
+    points = journal.fold(points, records, obstacle_point_from_index, as_tuple)
+    write_level(path, (config, points, b""))
+    saved_obstacles = points
+
+def write_level(path: str, state: tuple[dict, Iterable, bytes]):
+    """ 
+    Write a level from a copy of its contents, picking the format from the file extension
+    Args:
+        path (str): The level file to write
+        state (tuple[dict, Iterable, bytes]): The config, the obstacles in tree order and the tree shape
+    """
+    config, points, shape = state
+    if levelfile.is_binary(path):
+        levelfile.write(path, config, ((obj.x, obj.y, obj.type) for obj in points), shape)
+    else:
+        write_json(path, config, points, shape)
+
 # ------------------------------------------------
 # Misc
 # ------------------------------------------------
@@ -0,0 +1,225 @@
+"""
+Module for the level editor's crash journal.
+
+Every obstacle added or deleted in the editor is appended to a journal file next to the level,
+as one fixed-size record::
+
+    op    b"+" for an add, b"-" for a delete
+    x, y  the obstacle position, signed 64 bits
+    type  the obstacle type index
+
+From time to time the journal is compacted into a full snapshot of the level on a background
+thread: the live journal is renamed to a compacting one, a fresh journal takes its place, and
+the thread folds the compacting journal into the obstacles of the previous snapshot, see fold,
+writes the new snapshot and removes the compacting journal. The frame loop only renames a file,
+it never walks the level. On startup the level file is loaded and both journals are replayed
+over it, the compacting one first. Replaying is idempotent, the last record about a position
+decides whether it holds an obstacle, so journals already folded into the snapshot do no harm.
+"""
+
+import os
+import bisect
+import struct
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional
+
+RECORD = struct.Struct("<cqqB")
+ADD = b"+"
+DELETE = b"-"
+
+# Suffixes of the live journal and the one being compacted, appended to the level path
+SUFFIX = ".journal"
+COMPACTING_SUFFIX = ".journal.compacting"
+
+def journal_paths(level_path: str) -> tuple[str, str]:
+    """
+    Returns the journals of a level, in replay order
+    Args:
+        level_path (str): The level file
+    Returns:
+        (str, str): The compacting and the live journal paths
+    """
+    return (level_path + COMPACTING_SUFFIX, level_path + SUFFIX)
+
+def read(path: str) -> Iterator[tuple[bytes, int, int, int]]:
+    """
+    Yields the records of a journal, a missing journal has none.
+    A record cut short by a crash while it was written is dropped.
+    Args:
+        path (str): The journal file
+    Yields:
+        (bytes, int, int, int): The op, x, y and type of each record
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return
+    whole = len(data) - len(data) % RECORD.size
+    yield from RECORD.iter_unpack(memoryview(data)[:whole])
+
+def has_records(level_path: str) -> bool:
+    """ Whether the level has journaled edits left to replay """
+    return any(os.path.exists(path) and os.path.getsize(path) >= RECORD.size for path in journal_paths(level_path))
+
+def replay(level_path: str, add: Callable[[int, int, int], None], delete: Callable[[int, int, int], None]) -> int:
+    """
+    Replays the journals of a level, see journal_paths
+    Args:
+        level_path (str): The level file
+        add (Callable[[int, int, int], None]): Called with the x, y and type of every added obstacle
+        delete (Callable[[int, int, int], None]): Called with the x, y and type of every deleted obstacle
+    Returns:
+        int: The number of records replayed
+    """
+    count = 0
+    for path in journal_paths(level_path):
+        for op, x, y, type in read(path):
+            (add if op == ADD else delete)(x, y, type)
+            count += 1
+    return count
+
+def fold(values: list, records: list[tuple[bytes, int, int, int]], make: Callable[[int, int, int], Any],
+         position: Callable[[Any], tuple[int, int]]) -> list:
+    """
+    Applies journal records to the obstacles of a level, with the same outcome as replaying them over an index:
+    an add keeps the obstacle already at its position, a delete removes whatever is there.
+    Costs O(k log n) searches for k touched positions, the rest of the values are copied over in slices.
+    Args:
+        values (list): The obstacles in order, left untouched
+        records (list[tuple[bytes, int, int, int]]): The records to apply, see read
+        make (Callable[[int, int, int], Any]): Builds an added obstacle from its type, x and y
+        position (Callable[[Any], tuple[int, int]]): Returns the (x, y) of an obstacle, it must sort like the obstacles
+    Returns:
+        list: The obstacles in order after the records, values itself when there are none
+    """
+    # touched position -> (slot in values, whether values holds it, what ends up there or None)
+    touched: dict[tuple[int, int], tuple[int, bool, Any]] = {}
+    for op, x, y, type in records:
+        at = (x, y)
+        if at in touched:
+            index, present, value = touched[at]
+        else:
+            index = bisect.bisect_left(values, at, key=position)
+            present = index < len(values) and position(values[index]) == at
+            value = values[index] if present else None
+        if op == ADD:
+            if value is None:
+                value = make(type, x, y)
+        else:
+            value = None
+        touched[at] = (index, present, value)
+    if not touched:
+        return values
+    folded = []
+    start = 0
+    for at in sorted(touched):
+        index, present, value = touched[at]
+        folded.extend(values[start:index])
+        if value is not None:
+            folded.append(value)
+        start = index + 1 if present else index
+    folded.extend(values[start:])
+    return folded
+
+def discard(level_path: str):
+    """ Removes the journals of a level, once a full save made them useless """
+    for path in journal_paths(level_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+class Journal:
+    """
+    Append-only edit journal of a level, with background compaction.
+    Appends are buffered writes flushed at once, cheap enough to run on every edit from the frame loop,
+    and they reach the OS right away, so only a machine crash can lose them, not a game crash.
+    """
+    # Compact once this many records piled up, or once edits waited this many seconds in the journal
+    compact_records: int = 1_000
+    compact_interval: float = 30
+
+    def __init__(self, level_path: str, save: Callable[[str, tuple, list], None]):
+        """
+        Args:
+            level_path (str): The level file, the journals sit next to it
+            save (Callable[[str, tuple, list], None]): Writes a snapshot to the given path, in the format its extension
+                names, from the state returned by the snapshot callable given to compact and the records of the
+                compacting journal, see fold. Runs on the compaction thread.
+        """
+        self.level_path = level_path
+        self.compacting_path, self.path = journal_paths(level_path)
+        self.save = save
+        self.records = 0
+        self.last_compaction = time.monotonic()
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+        self.__file = open(self.path, "ab")
+
+    def __append(self, op: bytes, x: int, y: int, type: int):
+        self.__file.write(RECORD.pack(op, int(x), int(y), int(type)))
+        self.__file.flush()
+        self.records += 1
+
+    def add(self, x: int, y: int, type: int):
+        """ Journals an added obstacle """
+        self.__append(ADD, x, y, type)
+
+    def delete(self, x: int, y: int, type: int):
+        """ Journals a deleted obstacle """
+        self.__append(DELETE, x, y, type)
+
+    def compacting(self) -> bool:
+        """ Whether a compaction is running """
+        return self.thread is not None and self.thread.is_alive()
+
+    def due(self) -> bool:
+        """ Whether the journal grew enough, or waited long enough with edits in it, to be compacted """
+        if self.records == 0 or self.compacting():
+            return False
+        return self.records >= self.compact_records or time.monotonic() - self.last_compaction >= self.compact_interval
+
+    def compact(self, snapshot: Callable[[], tuple]) -> bool:
+        """
+        Starts compacting the journal into a new level snapshot on a background thread
+        Args:
+            snapshot (Callable[[], tuple]): Returns the state handed to save, like the level config.
+                Called right away, on the caller's thread, it should be cheap: the obstacles come from the journal.
+        Returns:
+            bool: Whether a compaction started, only one runs at a time
+        """
+        if self.compacting() or os.path.exists(self.compacting_path):
+            return False
+        state = snapshot()
+        # rotate, new edits go to a fresh journal while the old one is folded into the snapshot
+        self.__file.close()
+        os.replace(self.path, self.compacting_path)
+        self.__file = open(self.path, "ab")
+        self.records = 0
+        self.last_compaction = time.monotonic()
+        self.thread = threading.Thread(target=self.__compact, args=(state,), name="journal-compaction", daemon=True)
+        self.thread.start()
+        return True
+
+    def __compact(self, state: tuple):
+        # keep the extension, the level format is picked from it
+        root, extension = os.path.splitext(self.level_path)
+        temporary = root + ".tmp" + extension
+        try:
+            self.save(temporary, state, list(read(self.compacting_path)))
+            # the snapshot only replaces the level once it is complete, then the journal it covers can go
+            os.replace(temporary, self.level_path)
+            os.remove(self.compacting_path)
+        except BaseException as error:
+            # the compacting journal stays, the next startup replays it
+            self.error = error
+
+    def wait(self):
+        """ Blocks until the running compaction, if any, is over """
+        if self.thread is not None:
+            self.thread.join()
+
+    def close(self):
+        """ Waits for the running compaction and closes the journal, the journal files stay on disk """
+        self.wait()
+        self.__file.close()
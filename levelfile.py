@@ -0,0 +1,182 @@
+"""
+Module for the compact binary level format.
+
+Layout, little-endian::
+
+    header   magic "CNGY", version, the typecodes of the three columns,
+             config length, obstacle count, the x of the first obstacle
+             and the shape length
+    config   the level config block, as UTF-8 JSON
+    columns  x deltas, y and type of every obstacle in tree order,
+             each column fixed-width and aligned to 8 bytes
+    shape    optional, the AVL tree shape, see tree.Tree.shape
+
+Column widths are picked at save time from the values they hold, so a regular level
+takes 3 to 5 bytes per obstacle. Loading maps the file and reads the columns through
+typed memoryviews, without parsing or copying them.
+"""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import Iterable, Iterator
+
+MAGIC = b"CNGY"
+VERSION = 2
+EXTENSION = ".lvl"
+
+HEADER = struct.Struct("<4sB3sIIqI")
+# Version 1 files have no shape
+HEADER_V1 = struct.Struct("<4sB3sIIq")
+ALIGNMENT = 8
+
+# Signed typecodes, from the narrowest
+TYPECODES = "bhiq"
+
+def is_binary(path: str) -> bool:
+    """
+    Tells whether a level path uses the binary format
+    Args:
+        path (str): The level path
+    Returns:
+        bool: True for binary levels, False for JSON ones
+    """
+    return path.endswith(EXTENSION)
+
+def narrowest_typecode(values: array) -> str:
+    """ Returns the narrowest signed typecode able to hold every value """
+    low = min(values, default=0)
+    high = max(values, default=0)
+    for typecode in TYPECODES:
+        bits = array(typecode).itemsize * 8 - 1
+        if -(1 << bits) <= low and high < (1 << bits):
+            return typecode
+    raise OverflowError("obstacle coordinates don't fit in 64 bits")
+
+def aligned(size: int) -> int:
+    """ Rounds a size up to the column alignment """
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+def write(path: str, config: dict, records: Iterable[tuple[int, int, int]], shape: bytes = b""):
+    """
+    Writes a binary level
+    Args:
+        path (str): The file to write
+        config (dict): The level config block
+        records (Iterable[tuple[int, int, int]]): The (x, y, type) of every obstacle, in tree order
+        shape (bytes, optional): The shape of the tree holding them, empty to leave it out
+    """
+    xs, ys, types = array("q"), array("q"), array("q")
+    for x, y, type in records:
+        xs.append(x)
+        ys.append(y)
+        types.append(type)
+    base_x = xs[0] if xs else 0
+    deltas = array("q", (x - prev for x, prev in zip(xs, [base_x, *xs])))
+    columns = [array(narrowest_typecode(column), column) for column in (deltas, ys, types)]
+    config_data = json.dumps(config).encode("utf-8")
+
+    with open(path, "wb") as file:
+        typecodes = "".join(column.typecode for column in columns).encode("ascii")
+        file.write(HEADER.pack(MAGIC, VERSION, typecodes, len(config_data), len(xs), base_x, len(shape)))
+        file.write(config_data)
+        position = HEADER.size + len(config_data)
+        for column in columns:
+            file.write(bytes(aligned(position) - position))
+            position = aligned(position)
+            if sys.byteorder != "little":
+                column.byteswap()
+            file.write(column.tobytes())
+            position += column.itemsize * len(column)
+        file.write(shape)
+
+class BinaryLevel:
+    """
+    An open binary level, use it as a context manager::
+
+        with BinaryLevel(path) as level:
+            tree.bulk_load(level.records(), presorted=True)
+
+    Attributes:
+        config (dict): The level config block
+        count (int): The number of obstacles
+        shape (bytes): The shape of the saved tree, empty if the file has none
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The file to read
+        """
+        self.path = path
+        self.config = {}
+        self.count = 0
+        self.base_x = 0
+        self.shape = b""
+        self.columns = []
+        self.__file = None
+        self.__map = None
+        self.__views = []
+
+    def __enter__(self) -> "BinaryLevel":
+        self.__file = open(self.path, "rb")
+        try:
+            self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__read()
+        except BaseException:
+            # __exit__ never runs when __enter__ fails
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __read(self):
+        buffer = memoryview(self.__map)
+        self.__views.append(buffer)
+        magic, version = bytes(buffer[:4]), buffer[4]
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{self.path} is not a version 1 to {VERSION} binary level")
+        if version == 1:
+            _, _, typecodes, config_size, self.count, self.base_x = HEADER_V1.unpack_from(buffer)
+            shape_size = 0
+            position = HEADER_V1.size
+        else:
+            _, _, typecodes, config_size, self.count, self.base_x, shape_size = HEADER.unpack_from(buffer)
+            position = HEADER.size
+        self.config = json.loads(bytes(buffer[position:position + config_size]))
+        position += config_size
+        self.columns = []
+        for typecode in typecodes.decode("ascii"):
+            position = aligned(position)
+            size = array(typecode).itemsize * self.count
+            if sys.byteorder == "little":
+                column = buffer[position:position + size].cast(typecode)
+                self.__views.append(column)
+            else:
+                column = array(typecode)
+                column.frombytes(buffer[position:position + size])
+                column.byteswap()
+            self.columns.append(column)
+            position += size
+        self.shape = bytes(buffer[position:position + shape_size])
+
+    def records(self) -> Iterator[tuple[int, int, int]]:
+        """
+        Yields the stored obstacles, in tree order
+        Yields:
+            (int, int, int): The x, y and type of each obstacle
+        """
+        deltas, ys, types = self.columns
+        # the first delta is always 0, the first x is the base itself
+        return zip(accumulate(deltas[1:], initial=self.base_x), ys, types)
+
+    def __exit__(self, *exc_info):
+        self.columns = []
+        for view in reversed(self.__views):
+            view.release()
+        self.__views = []
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+        self.__file.close()
@@ -2,6 +2,7 @@
 Main file to run the game.
 """
 
+import argparse
 import pygame
 
 # ------------------------------------------------
@@ -19,16 +20,33 @@ clock = pygame.time.Clock()
 
 import game
 
-from tree import draw_tree
+from tree import Tree, draw_tree
+from persistenttree import PersistentTree
+from orderedindex import BACKENDS
+from simulate import save_inputs
 
 def main():
+    parser = argparse.ArgumentParser(description="Correlones de Canaguay")
+    parser.add_argument("level", nargs="?", default="data.json", help="level file to play and edit, .json or binary .lvl (default: data.json)")
+    parser.add_argument("--record", metavar="FILE", help="save the keys pressed during the last play session, for simulate.py")
+    parser.add_argument("--dirty", action="store_true", help="only redraw and push the changed screen regions while the camera stands still")
+    parser.add_argument("--index", choices=BACKENDS, help="obstacle index backend, overrides the level's index_backend")
+    args = parser.parse_args()
+
     running = True
+    recording = []
+    previous_dirty_rects = []
+    # the road under the moving parts, kept by the whole frames for the partial ones
+    ground = pygame.Surface(screen.get_size()) if args.dirty else None
 
     # ------------------------------------------------
     # Logic initialization
     # ------------------------------------------------
 
-    game.init(SCREEN_WIDTH=SCREEN_WIDTH, SCREEN_HEIGHT=SCREEN_HEIGHT)
+    game.index_backend_override = args.index
+    game.init(SCREEN_WIDTH=SCREEN_WIDTH, SCREEN_HEIGHT=SCREEN_HEIGHT, path=args.level)
+    # edits are saved back in the format the level was loaded from
+    game.start_autosave(args.level)
 
     # ------------------------------------------------
     # Main loop
@@ -41,25 +59,44 @@ def main():
             if event.type == pygame.QUIT:
                 running = False
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_v:
-                    (min_value, max_value) = game.get_visible_obstacle_limits()
-                    draw_tree(game.tree, min_value=min_value.value, max_value=max_value.value)
+                if event.key == pygame.K_v and not isinstance(game.tree, (Tree, PersistentTree)):
+                    print(f"The tree view needs the avl or persistent index backend, not {game.active_index_backend}")
+                elif event.key == pygame.K_v:
+                    (min_node, max_node) = game.get_visible_obstacle_limits()
+                    if min_node and max_node:
+                        draw_tree(game.tree, min_value=min_node.value, max_value=max_node.value)
+                    else:
+                        draw_tree(game.tree)
+            was_playing = game.game_state == game.State.PLAYING
             game.event_update(event)
+            if game.game_state == game.State.PLAYING:
+                if not was_playing:
+                    recording = []
+                elif event.type == pygame.KEYDOWN:
+                    recording.append((game.play_ticks, pygame.key.name(event.key)))
 
-        # fill the screen with a color to wipe away anything from last frame
-        screen.fill((56, 0, 15))
         # update the game logic
         game.update()
-        # draw the game to the screen
-        game.draw(screen)
-        # flip() the display to put your work on screen
-        pygame.display.flip()
+        if args.dirty and not game.needs_full_redraw():
+            # only redraw and push what moved, what moved last frame has to be cleared too
+            game.draw_dirty(screen, ground, previous_dirty_rects)
+            pygame.display.update(previous_dirty_rects + game.dirty_rects)
+        else:
+            # fill the screen with a color to wipe away anything from last frame
+            screen.fill((56, 0, 15))
+            # draw the game to the screen
+            game.draw(screen, ground)
+            # flip() the display to put your work on screen
+            pygame.display.flip()
+        previous_dirty_rects = game.dirty_rects
         # update game logic for end of frame
         game.post_update()
         # limits FPS to framerate
         clock.tick(game.framerate)
 
-    game.save_json()
+    game.stop_autosave()
+    if args.record:
+        save_inputs(args.record, recording)
 
     pygame.quit()
 
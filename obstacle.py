@@ -13,17 +13,21 @@ class ObstacleEntry:
         name (str): The name of the obstacle
         constructor (callable): The class constructor for the obstacle
         image (pygame.Surface): The image representing the obstacle
+        padding (tuple[int, int, int, int]): The hitbox padding, left, right, top and bottom
+        size (tuple[int, int]): The sprite width and height
     """
-    def __init__(self, damage, name, constructor, image):
+    def __init__(self, damage, name, constructor, image, padding = (0, 0, 0, 0), size = (0, 0)):
         self.damage = damage
         self.name = name
         self.constructor = constructor
         self.image = image
+        self.padding = padding
+        self.size = size
 
 obstacle_registry: dict[int, ObstacleEntry] = {}
 
 class Obstacle(pygame.sprite.Sprite):
-    """ Base class for an obstacle """
+    """ Base class for an obstacle type, only built once per type to fill obstacle_registry """
     type = -1
 
     def __init_subclass__(cls, **kwargs):
@@ -33,7 +37,8 @@ class Obstacle(pygame.sprite.Sprite):
         """
         super().__init_subclass__()
         cls.type = len(obstacle_registry)
-        obstacle_registry[cls.type] = ObstacleEntry(damage=kwargs["damage"], name=__name__, constructor=cls, image=cls().load_image())
+        prototype = cls()
+        obstacle_registry[cls.type] = ObstacleEntry(damage=kwargs["damage"], name=__name__, constructor=cls, image=prototype.image, padding=prototype.hitbox_padding, size=prototype.rect.size)
     
     def __init__(self, x = 0, y = 0):
         """ 
@@ -57,15 +62,63 @@ class Obstacle(pygame.sprite.Sprite):
             pygame.Surface: The image representing the obstacle
         """
         pass
-    
-    def as_point(self) -> Point:
+
+class ObstaclePoint(Point):
+    """
+    Flyweight obstacle, the value stored in the obstacle tree.
+    Only the position and the type live in each instance, everything else is shared through obstacle_registry.
+    """
+    __slots__ = ("type",)
+
+    def __init__(self, x: int, y: int, type: int):
+        """
+        Args:
+            x (int): The x coordinate of the obstacle
+            y (int): The y coordinate of the obstacle
+            type (int): The index of the obstacle type, must be registered
+        """
+        self.x = x
+        self.y = y
+        self.type = type
+
+    @property
+    def entry(self) -> ObstacleEntry:
+        """ The shared info of this obstacle type """
+        return obstacle_registry[self.type]
+
+    @property
+    def image(self) -> pygame.Surface:
+        """ The image representing the obstacle """
+        return obstacle_registry[self.type].image
+
+    @property
+    def width(self) -> int:
+        return obstacle_registry[self.type].size[0]
+
+    @property
+    def height(self) -> int:
+        return obstacle_registry[self.type].size[1]
+
+    @property
+    def right(self) -> int:
+        """ The x coordinate of the right edge """
+        return self.x + obstacle_registry[self.type].size[0]
+
+    @property
+    def bottom(self) -> int:
+        """ The y coordinate of the bottom edge """
+        return self.y + obstacle_registry[self.type].size[1]
+
+    def get_hitbox(self) -> tuple[int, int, int, int]:
         """
-        Wraps the object as a point for tree-lookup.
-        Lookup has to be easy, but comparison operators can't be overloaded without making this unhashable
+        Returns the world space hitbox, the sprite rect shrunk by the hitbox padding
         Returns:
-            Point: A point representing the obstacle's position
+            (int, int, int, int): The left, top, right and bottom edges
         """
-        return Point(self.rect.x, self.rect.y, self)
+        entry = obstacle_registry[self.type]
+        left, right, top, bottom = entry.padding
+        width, height = entry.size
+        return (self.x + left, self.y + top, self.x + width - right, self.y + height - bottom)
 
 class Hole(Obstacle, damage=20):
     """ A hole in the road """
@@ -126,20 +179,30 @@ def obstacle_texture_from_index(i) -> pygame.Surface:
     except KeyError:
         return res.Image.HOLE.value
 
-def obstacle_from_index(i: int, x: int = 0, y: int = 0) -> Obstacle:
+def obstacle_right(point: Point) -> int:
     """ 
-    Returns an instance of an obstacle given it's type 
+    Returns where the obstacle behind a point ends, the extent used by the obstacle interval tree
+    Args:
+        point (Point): The obstacle point
+    Returns:
+        int: The x coordinate of the obstacle's right edge
+    """
+    return point.right
+
+def obstacle_point_from_index(i: int, x: int = 0, y: int = 0) -> ObstaclePoint:
+    """ 
+    Returns the flyweight point of an obstacle given it's type, without building its sprite
     Args:
         i (int): The index of the obstacle type
         x (int): The x coordinate of the obstacle
         y (int): The y coordinate of the obstacle
     Returns:
-        Obstacle: An instance of the obstacle
+        ObstaclePoint: The obstacle point, unknown types become holes
     """
-    try:
-        return obstacle_registry[i].constructor(x, y)
-    except KeyError:
-        return Hole(x, y)
+    if i not in obstacle_registry:
+        i = Hole.type
+    # sprite rects truncate their coordinates, keep the same positions
+    return ObstaclePoint(int(x), int(y), i)
 
 def get_obstacle_types_count() -> int:
     """ 
@@ -147,4 +210,23 @@ def get_obstacle_types_count() -> int:
     Returns:
         int: The number of obstacle types
     """
-    return len(obstacle_registry)
\ No newline at end of file
+    return len(obstacle_registry)
+
+def obstacle_lo_key(x) -> Point:
+    """ 
+    Returns the lowest point an obstacle reaching x could have, lets index backends without
+    interval augmentation answer overlap queries with a range scan
+    Args:
+        x (int): The x coordinate to reach
+    Returns:
+        Point: The low bound of the scan
+    """
+    return Point(x - get_obstacle_max_width(), float("-inf"))
+
+def get_obstacle_max_width() -> int:
+    """ 
+    Get the width of the widest obstacle variant
+    Returns:
+        int: The width in pixels
+    """
+    return max((entry.image.get_width() for entry in obstacle_registry.values()), default=0)
@@ -0,0 +1,349 @@
+""" Module for the ordered set interface shared by the obstacle index backends """
+
+from typing import Optional, Any
+
+class OrderedIndex:
+    """
+    Base class for ordered sets of unique, comparable values.
+    Backends provide insert, remove, the bounds, first, last and clear, everything else is built on top of them here
+    and can be overridden with something faster.
+
+    Bounds, first and last return cursors: objects with a value attribute and next/prev methods returning the
+    neighbouring cursors (None past the ends), tree.Node being one of them.
+    Cursors are only valid until the next mutation, see version.
+    Attributes:
+        version (int): Bumped on every mutation, lets cursors held outside the index know they went stale
+        extent (Optional[callable]): Maps a value to the end of the interval it spans, enables overlap queries
+        lo_key (Optional[callable]): Maps an extent bound to the lowest value whose interval could reach it
+    """
+    version: int = 0
+
+    def __init__(self, extent = None, lo_key = None):
+        """
+        Args:
+            extent (callable, optional): Maps each value to the end of the interval it spans, the value itself being the start
+            lo_key (callable, optional): Maps an extent bound to the lowest value whose interval could still reach it,
+                lets backends without interval augmentation answer overlap queries with a range scan
+        """
+        self.extent = extent
+        self.lo_key = lo_key
+
+    # ------------------------------------------------
+    # Backend primitives
+    # ------------------------------------------------
+
+    def insert(self, item) -> bool:
+        """
+        Adds a single item if it is not there yet, without touching the version
+        Returns:
+            bool: True if the item was added
+        """
+        raise NotImplementedError
+
+    def remove(self, item) -> bool:
+        """
+        Removes a single item if it is there, without touching the version
+        Returns:
+            bool: True if the item was removed
+        """
+        raise NotImplementedError
+
+    def lower_bound(self, item, inclusive: bool = True):
+        """ Returns a cursor to the first value greater or equal than item (greater if not inclusive), or None """
+        raise NotImplementedError
+
+    def upper_bound(self, item, inclusive: bool = True):
+        """ Returns a cursor to the last value lower or equal than item (lower if not inclusive), or None """
+        raise NotImplementedError
+
+    def first(self):
+        """ Returns a cursor to the lowest value, or None if the index is empty """
+        raise NotImplementedError
+
+    def last(self):
+        """ Returns a cursor to the highest value, or None if the index is empty """
+        raise NotImplementedError
+
+    def clear(self):
+        """ Clear the index """
+        raise NotImplementedError
+
+    # ------------------------------------------------
+    # Shared operations
+    # ------------------------------------------------
+
+    def add(self, *args):
+        """
+        Add only if not exists
+        Args:
+            *args (Any): The items to add
+        """
+        for item in args:
+            if self.insert(item):
+                self.version += 1
+
+    def delete(self, *args):
+        """
+        Delete items if they exist
+        Args:
+            *args (Any): The items to delete
+        """
+        for item in args:
+            if self.remove(item):
+                self.version += 1
+
+    def search(self, item):
+        """
+        Search and return None if not found
+        Args:
+            item (Any): The item to search for
+        Returns:
+            The cursor to the item, or None if not found
+        """
+        node = self.lower_bound(item)
+        if node is not None and node.value == item:
+            return node
+        return None
+
+    def __contains__(self, item):
+        return self.search(item) is not None
+
+    def contains(self, item) -> bool:
+        """
+        Check if the index contains the item
+        Args:
+            item (Any): The item to check for
+        Returns:
+            bool: True if the item is in the index, False otherwise
+        """
+        return item in self
+
+    def neighbors(self, item) -> tuple[Optional[Any], Optional[Any]]:
+        """
+        Returns the values right before and right after an item, the item itself may or may not be stored
+        Args:
+            item (Any): The item
+        Returns:
+            (Optional[Any], Optional[Any]): The previous and the next values, None past the ends
+        """
+        before = self.upper_bound(item, inclusive=False)
+        after = self.lower_bound(item, inclusive=False)
+        return (before.value if before is not None else None, after.value if after is not None else None)
+
+    def irange(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """
+        Lazily yields the cursors whose values lie between lo and hi, in order.
+        The index must not be modified while the generator is alive.
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+            reverse (bool, optional): Yield from hi down to lo
+        Yields:
+            The cursors in range
+        """
+        if reverse:
+            node = self.last() if hi is None else self.upper_bound(hi, inclusive[1])
+            while node is not None:
+                if lo is not None and ((node.value < lo) if inclusive[0] else not (lo < node.value)):
+                    return
+                yield node
+                node = node.prev()
+        else:
+            node = self.first() if lo is None else self.lower_bound(lo, inclusive[0])
+            while node is not None:
+                if hi is not None and ((hi < node.value) if inclusive[1] else not (node.value < hi)):
+                    return
+                yield node
+                node = node.next()
+
+    def range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """
+        Lazily yields the values between lo and hi, in order. See irange for the details.
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+            reverse (bool, optional): Yield from hi down to lo
+        Yields:
+            Any: The values in range
+        """
+        for node in self.irange(lo, hi, inclusive, reverse):
+            yield node.value
+
+    def __iter__(self):
+        return self.range()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def rank(self, item) -> int:
+        """
+        Counts the values lower than item, item doesn't need to be stored
+        Args:
+            item (Any): The item
+        Returns:
+            int: The amount of lower values
+        """
+        return self.count_range(None, item, (True, False))
+
+    def select(self, k: int):
+        """
+        Returns the cursor to the k-th lowest value
+        Args:
+            k (int): The index in order, starting at 0
+        Returns:
+            The cursor, or None if k is out of range
+        """
+        if k < 0:
+            return None
+        node = self.first()
+        while node is not None and k > 0:
+            node = node.next()
+            k -= 1
+        return node
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        """
+        Counts the values between lo and hi. Walks them here, order statistic backends do it in O(log n).
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+        Returns:
+            int: The amount of values in range
+        """
+        return sum(1 for _ in self.range(lo, hi, inclusive))
+
+    def ioverlapping(self, lo, hi):
+        """
+        Lazily yields, in order, the cursors whose interval [value, extent(value)] overlaps [lo, hi].
+        Scans the values from lo_key(lo) up to hi, backends with interval augmentation do better.
+        Args:
+            lo (Any): The lower bound, compared against extents
+            hi (Any): The upper bound, compared against values
+        Yields:
+            The overlapping cursors
+        """
+        if self.extent is None or self.lo_key is None:
+            raise ValueError("overlap queries need an index built with extent and lo_key functions")
+        extent = self.extent
+        for node in self.irange(self.lo_key(lo), hi):
+            if not extent(node.value) < lo:
+                yield node
+
+    def overlapping(self, lo, hi):
+        """
+        Lazily yields, in order, the values whose interval overlaps [lo, hi]. See ioverlapping for the details.
+        Args:
+            lo (Any): The lower bound, compared against extents
+            hi (Any): The upper bound, compared against values
+        Yields:
+            Any: The overlapping values
+        """
+        if self.extent is None or self.lo_key is None:
+            raise ValueError("overlap queries need an index built with extent and lo_key functions")
+        extent = self.extent
+        for value in self.range(self.lo_key(lo), hi):
+            if not extent(value) < lo:
+                yield value
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        """
+        Replace the index contents with the given items.
+        Duplicates are dropped keeping the first one, just like repeated calls to add would do.
+        Args:
+            iterable (Iterable): The items to load
+            presorted (bool, optional): Skip sorting when the items already come in ascending order
+        """
+        items = sorted_unique(iterable, presorted)
+        self.clear()
+        for item in items:
+            self.insert(item)
+
+    @classmethod
+    def from_sorted(cls, iterable, **kwargs) -> "OrderedIndex":
+        """
+        Build a new index from items already in ascending order
+        Args:
+            iterable (Iterable): The sorted items
+            **kwargs: Forwarded to the constructor
+        Returns:
+            OrderedIndex: The new index
+        """
+        index = cls(**kwargs)
+        index.bulk_load(iterable, presorted=True)
+        return index
+
+    def LIR_list(self) -> list:
+        """
+        Returns the values in order as a list
+        """
+        return list(self.range())
+
+def sorted_unique(iterable, presorted: bool = False, key = None) -> list:
+    """
+    Sorts items and drops the duplicates, keeping the first of each
+    Args:
+        iterable (Iterable): The items
+        presorted (bool, optional): Skip sorting when the items already come in ascending order
+        key (callable, optional): Sort and compare the items by this key instead of the items themselves
+    Returns:
+        list: The unique items in ascending order
+    """
+    items = list(iterable)
+    if key is None:
+        if not presorted:
+            items.sort()
+        unique = []
+        for item in items:
+            if not unique or not item == unique[-1]:
+                unique.append(item)
+        return unique
+    if not presorted:
+        items.sort(key=key)
+    unique = []
+    last = None
+    for item in items:
+        item_key = key(item)
+        if not unique or not item_key == last:
+            unique.append(item)
+            last = item_key
+    return unique
+
+# Backend names accepted by make_index, the config key index_backend and the --index flags
+BACKENDS = ("avl", "btree", "sorted", "skiplist", "persistent", "array")
+
+def make_index(backend: str = "avl", key = None, **kwargs) -> OrderedIndex:
+    """
+    Creates an empty index
+    Args:
+        backend (str): One of BACKENDS
+        key (callable, optional): A sort key giving the same order as the values themselves, like point.as_tuple.
+            Only the backends able to compare keys faster use it, the others keep comparing the values.
+            The array backend compares machine ints and always packs its values with point.pack.
+        **kwargs: Forwarded to the backend constructor
+    Returns:
+        OrderedIndex: The new index
+    """
+    # the backends import this module, so they are only pulled in here
+    if backend == "avl":
+        from tree import Tree
+        return Tree(key=key, **kwargs)
+    elif backend == "btree":
+        from btree import BTree
+        return BTree(**kwargs)
+    elif backend == "sorted":
+        from sortedarray import SortedArray
+        return SortedArray(**kwargs)
+    elif backend == "skiplist":
+        from skiplist import SkipList
+        return SkipList(**kwargs)
+    elif backend == "persistent":
+        from persistenttree import PersistentTree
+        return PersistentTree(key=key, **kwargs)
+    elif backend == "array":
+        from arraytree import ArrayTree
+        from point import pack
+        return ArrayTree(key=pack, **kwargs)
+    raise ValueError(f"unknown index backend {backend!r}, expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,427 @@
+""" Module for a persistent AVL tree, where every edit makes a new version sharing the untouched subtrees """
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Any
+
+from orderedindex import OrderedIndex, sorted_unique
+from tree import shape_of
+
+class PersistentNode:
+    """
+    Immutable node of a PersistentTree.
+    Nodes are never modified once built, so a subtree can belong to any number of tree versions.
+    """
+    __slots__ = ("value", "key", "left", "right", "height", "size")
+
+    def __init__(self, value, key, left: Optional["PersistentNode"], right: Optional["PersistentNode"]):
+        """
+        Args:
+            value (Any): The stored value
+            key (Any): The key the value is compared by
+            left (Optional[PersistentNode]): The left subtree
+            right (Optional[PersistentNode]): The right subtree
+        """
+        self.value = value
+        self.key = key
+        self.left = left
+        self.right = right
+        left_h = left.height if left else 0
+        right_h = right.height if right else 0
+        self.height = 1 + (left_h if left_h > right_h else right_h)
+        self.size = 1 + (left.size if left else 0) + (right.size if right else 0)
+
+def height(node: Optional[PersistentNode]) -> int:
+    """ Returns the height of a subtree, 0 when empty """
+    return node.height if node else 0
+
+def size(node: Optional[PersistentNode]) -> int:
+    """ Returns the amount of values in a subtree, 0 when empty """
+    return node.size if node else 0
+
+def balanced(value, key, left: Optional[PersistentNode], right: Optional[PersistentNode]) -> PersistentNode:
+    """
+    Builds a node over two subtrees whose heights differ by two at most, rotating it back into balance.
+    Rotations build new nodes too, the subtrees handed in are left untouched.
+    Returns:
+        PersistentNode: The root of the balanced subtree
+    """
+    left_h = height(left)
+    right_h = height(right)
+    if left_h > right_h + 1:
+        if height(left.left) < height(left.right):
+            pivot = left.right
+            return PersistentNode(pivot.value, pivot.key,
+                PersistentNode(left.value, left.key, left.left, pivot.left),
+                PersistentNode(value, key, pivot.right, right))
+        return PersistentNode(left.value, left.key, left.left, PersistentNode(value, key, left.right, right))
+    if right_h > left_h + 1:
+        if height(right.right) < height(right.left):
+            pivot = right.left
+            return PersistentNode(pivot.value, pivot.key,
+                PersistentNode(value, key, left, pivot.left),
+                PersistentNode(right.value, right.key, pivot.right, right.right))
+        return PersistentNode(right.value, right.key, PersistentNode(value, key, left, right.left), right.right)
+    return PersistentNode(value, key, left, right)
+
+def inserted(node: Optional[PersistentNode], value, key) -> PersistentNode:
+    """
+    Returns the subtree with the value added, copying only the path down to it
+    Returns:
+        PersistentNode: The new root, node itself if the key was already there
+    """
+    if node is None:
+        return PersistentNode(value, key, None, None)
+    if key < node.key:
+        left = inserted(node.left, value, key)
+        if left is node.left:
+            return node
+        return balanced(node.value, node.key, left, node.right)
+    if node.key < key:
+        right = inserted(node.right, value, key)
+        if right is node.right:
+            return node
+        return balanced(node.value, node.key, node.left, right)
+    return node
+
+def removed_min(node: PersistentNode) -> tuple[Optional[PersistentNode], PersistentNode]:
+    """
+    Returns the subtree without its lowest node, along with that node
+    Returns:
+        (Optional[PersistentNode], PersistentNode): The new root and the removed node
+    """
+    if node.left is None:
+        return (node.right, node)
+    left, lowest = removed_min(node.left)
+    return (balanced(node.value, node.key, left, node.right), lowest)
+
+def removed(node: Optional[PersistentNode], key) -> Optional[PersistentNode]:
+    """
+    Returns the subtree without the key, copying only the path down to it
+    Returns:
+        Optional[PersistentNode]: The new root, node itself if the key wasn't there
+    """
+    if node is None:
+        return None
+    if key < node.key:
+        left = removed(node.left, key)
+        if left is node.left:
+            return node
+        return balanced(node.value, node.key, left, node.right)
+    if node.key < key:
+        right = removed(node.right, key)
+        if right is node.right:
+            return node
+        return balanced(node.value, node.key, node.left, right)
+    if node.left is None:
+        return node.right
+    if node.right is None:
+        return node.left
+    right, successor = removed_min(node.right)
+    return balanced(successor.value, successor.key, node.left, right)
+
+def built(values: list, keys: list, start: int, stop: int) -> Optional[PersistentNode]:
+    """ Builds a perfectly balanced subtree over values[start:stop], already in order """
+    if start >= stop:
+        return None
+    mid = (start + stop) // 2
+    return PersistentNode(values[mid], keys[mid], built(values, keys, start, mid), built(values, keys, mid + 1, stop))
+
+class PersistentCursor:
+    """
+    Cursor to a node of a PersistentTree, holding the path down from the root since nodes have no parent links.
+    It stays valid on the version it was taken from, whatever happens to the tree afterwards.
+    """
+    __slots__ = ("path",)
+
+    def __init__(self, path: list[PersistentNode]):
+        self.path = path
+
+    @property
+    def value(self):
+        return self.path[-1].value
+
+    def next(self) -> Optional["PersistentCursor"]:
+        """ Returns the cursor to the next value """
+        path = self.path
+        node = path[-1].right
+        if node is not None:
+            path = path + [node]
+            while node.left is not None:
+                node = node.left
+                path.append(node)
+            return PersistentCursor(path)
+        # climb while coming up from a right child
+        i = len(path) - 1
+        while i > 0 and path[i - 1].right is path[i]:
+            i -= 1
+        return PersistentCursor(path[:i]) if i > 0 else None
+
+    def prev(self) -> Optional["PersistentCursor"]:
+        """ Returns the cursor to the previous value """
+        path = self.path
+        node = path[-1].left
+        if node is not None:
+            path = path + [node]
+            while node.right is not None:
+                node = node.right
+                path.append(node)
+            return PersistentCursor(path)
+        i = len(path) - 1
+        while i > 0 and path[i - 1].left is path[i]:
+            i -= 1
+        return PersistentCursor(path[:i]) if i > 0 else None
+
+    def __eq__(self, other):
+        return isinstance(other, PersistentCursor) and self.path[-1] is other.path[-1]
+
+    def __hash__(self):
+        return id(self.path[-1])
+
+class PersistentTree(OrderedIndex):
+    """
+    AVL tree made of immutable nodes: an edit copies the O(log n) nodes on the path to the change
+    and shares every other subtree with the previous version.
+    Versions are kept as an undo history, so undo and redo only swap the root,
+    and snapshot hands out a frozen version in O(1) that later edits can't reach.
+    Edits made inside a batch block share a single undo step.
+    """
+    # Most edits kept to undo
+    history_limit: int = 10_000
+
+    def __init__(self, extent = None, lo_key = None, key = None):
+        """
+        Args:
+            extent (callable, optional): See orderedindex.OrderedIndex
+            lo_key (callable, optional): See orderedindex.OrderedIndex
+            key (callable, optional): Compare the values by this key, see tree.Tree
+        """
+        super().__init__(extent, lo_key)
+        self.key = key
+        self.root: Optional[PersistentNode] = None
+        # (root before, changes) to undo and (root after, changes) to redo, a change being (added, value)
+        self.undo_history: deque[tuple[Optional[PersistentNode], list[tuple[bool, Any]]]] = deque(maxlen=self.history_limit)
+        self.redo_history: list[tuple[Optional[PersistentNode], list[tuple[bool, Any]]]] = []
+        # changes of the open batch, None outside of one
+        self.__batch: Optional[list[tuple[bool, Any]]] = None
+
+    def key_of(self, item):
+        """ Returns the key an item is compared by """
+        return item if self.key is None else self.key(item)
+
+    def __len__(self) -> int:
+        return size(self.root)
+
+    def __commit(self, root: Optional[PersistentNode], change: tuple[bool, Any]):
+        if self.__batch is None:
+            self.undo_history.append((self.root, [change]))
+        else:
+            # the first edit of a batch opens its undo step, the next ones join it
+            if not self.__batch:
+                self.undo_history.append((self.root, self.__batch))
+            self.__batch.append(change)
+        self.redo_history.clear()
+        self.root = root
+
+    def insert(self, item) -> bool:
+        root = inserted(self.root, item, self.key_of(item))
+        if root is self.root:
+            return False
+        self.__commit(root, (True, item))
+        return True
+
+    def remove(self, item) -> bool:
+        cursor = self.search(item)
+        if cursor is None:
+            return False
+        self.__commit(removed(self.root, cursor.path[-1].key), (False, cursor.value))
+        return True
+
+    def clear(self):
+        self.root = None
+        self.undo_history.clear()
+        self.redo_history.clear()
+        self.version += 1
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        """ Same as orderedindex.OrderedIndex.bulk_load, built balanced in linear time. The undo history is dropped. """
+        values = sorted_unique(iterable, presorted, self.key)
+        keys = values if self.key is None else [self.key(value) for value in values]
+        self.clear()
+        self.root = built(values, keys, 0, len(values))
+
+    # ------------------------------------------------
+    # Versions
+    # ------------------------------------------------
+
+    @contextmanager
+    def batch(self):
+        """
+        Groups the edits made inside the with block into a single undo step, undone and redone at once.
+        A batch opened inside another one just joins it.
+        """
+        if self.__batch is not None:
+            yield
+            return
+        self.__batch = []
+        try:
+            yield
+        finally:
+            self.__batch = None
+
+    def undo(self) -> Optional[list[tuple[bool, Any]]]:
+        """
+        Goes back to the version before the last edit, or the last batch of them
+        Returns:
+            Optional[list[tuple[bool, Any]]]: The undone changes in the order they were made, whether each was an add
+                and its value, None if there was nothing to undo
+        """
+        if not self.undo_history:
+            return None
+        root, changes = self.undo_history.pop()
+        self.redo_history.append((self.root, changes))
+        self.root = root
+        self.version += 1
+        return changes
+
+    def redo(self) -> Optional[list[tuple[bool, Any]]]:
+        """
+        Applies again the last undone edit, or batch of them
+        Returns:
+            Optional[list[tuple[bool, Any]]]: The redone changes in the order they were made, whether each was an add
+                and its value, None if there was nothing to redo
+        """
+        if not self.redo_history:
+            return None
+        root, changes = self.redo_history.pop()
+        self.undo_history.append((self.root, changes))
+        self.root = root
+        self.version += 1
+        return changes
+
+    def shape(self) -> bytes:
+        """
+        Encodes the exact shape of the tree, see tree.Tree.shape
+        Returns:
+            bytes: The shape, as many digits as nodes
+        """
+        return shape_of(self.root, len(self))
+
+    def snapshot(self) -> "PersistentTree":
+        """
+        Returns the current version as a tree of its own, in O(1).
+        Edits to either tree never show in the other one, so it can be read from another thread.
+        """
+        frozen = PersistentTree(self.extent, self.lo_key, self.key)
+        frozen.root = self.root
+        frozen.version = self.version
+        return frozen
+
+    # ------------------------------------------------
+    # Queries
+    # ------------------------------------------------
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[PersistentCursor]:
+        key = self.key_of(item)
+        path = []
+        found = 0
+        node = self.root
+        while node is not None:
+            path.append(node)
+            if (node.key < key) if inclusive else not (key < node.key):
+                node = node.right
+            else:
+                found = len(path)
+                node = node.left
+        return PersistentCursor(path[:found]) if found else None
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[PersistentCursor]:
+        key = self.key_of(item)
+        path = []
+        found = 0
+        node = self.root
+        while node is not None:
+            path.append(node)
+            if (key < node.key) if inclusive else not (node.key < key):
+                node = node.left
+            else:
+                found = len(path)
+                node = node.right
+        return PersistentCursor(path[:found]) if found else None
+
+    def first(self) -> Optional[PersistentCursor]:
+        path = []
+        node = self.root
+        while node is not None:
+            path.append(node)
+            node = node.left
+        return PersistentCursor(path) if path else None
+
+    def last(self) -> Optional[PersistentCursor]:
+        path = []
+        node = self.root
+        while node is not None:
+            path.append(node)
+            node = node.right
+        return PersistentCursor(path) if path else None
+
+    def __count_lower(self, key, inclusive: bool) -> int:
+        """ Counts the values lower than key, or lower or equal if inclusive """
+        count = 0
+        node = self.root
+        while node is not None:
+            if (not key < node.key) if inclusive else (node.key < key):
+                count += size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def rank(self, item) -> int:
+        return self.__count_lower(self.key_of(item), False)
+
+    def select(self, k: int) -> Optional[PersistentCursor]:
+        if not 0 <= k < len(self):
+            return None
+        path = []
+        node = self.root
+        while True:
+            path.append(node)
+            left_size = size(node.left)
+            if k < left_size:
+                node = node.left
+            elif k > left_size:
+                k -= left_size + 1
+                node = node.right
+            else:
+                return PersistentCursor(path)
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        stop = len(self) if hi is None else self.__count_lower(self.key_of(hi), inclusive[1])
+        start = 0 if lo is None else self.__count_lower(self.key_of(lo), not inclusive[0])
+        return max(0, stop - start)
+
+    def range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """ Same as orderedindex.OrderedIndex.range, walking the version current when it started with a stack """
+        if reverse:
+            yield from OrderedIndex.range(self, lo, hi, inclusive, reverse)
+            return
+        lo_key = None if lo is None else self.key_of(lo)
+        hi_key = None if hi is None else self.key_of(hi)
+        stack = []
+        node = self.root
+        while node is not None:
+            if lo_key is not None and ((node.key < lo_key) if inclusive[0] else not (lo_key < node.key)):
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+        while stack:
+            node = stack.pop()
+            if hi_key is not None and ((hi_key < node.key) if inclusive[1] else not (node.key < hi_key)):
+                return
+            yield node.value
+            node = node.right
+            while node is not None:
+                stack.append(node)
+                node = node.left
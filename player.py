@@ -31,6 +31,20 @@ class Player(pygame.sprite.Sprite):
         self.HP = 100
         self.max_HP = 100
         self.damaged_timer = 0
+        self.jump_heights: list[float] = []
+        self.jump_angles: list[int] = []
+        self.rotated_images: dict[int, pygame.Surface] = {}
+        self.tables_key = None
+    
+    def reset(self):
+        """ Put the player back in the state it had when created """
+        self.rect.topleft = (0, 0)
+        self.lane = 0
+        self.y = 0
+        self.jump_timer = 0
+        self.jumping = False
+        self.HP = self.max_HP
+        self.damaged_timer = 0
     
     def update(self, *args, **kwargs):
         """ Update the player state """
@@ -71,26 +85,42 @@ class Player(pygame.sprite.Sprite):
             self.HP = max(self.HP - damage, 0)
             self.damaged_timer = 30
     
-    def draw(self, screen: pygame.Surface):
+    def build_tables(self):
+        """ 
+        Precomputes the jump arc for every jump_timer value, and the sprite rotated to every angle the arc reaches
+        """
+        self.jump_heights = []
+        self.jump_angles = []
+        self.rotated_images = {}
+        for timer in range(self.jump_distance + 1):
+            # Calcula la altura del salto basandose en el seno de jump_timer restringido en [ 0, pi ]
+            jump_y = self.rect.h * math.sin( math.pi * float(timer) / self.jump_distance )
+            # Calcula el angulo del jugador basandose en el seno de jump_timer restringido en [ 0, 2 * pi ] subida y bajada
+            jump_angle = round(math.sin( math.pi * 2 * float(timer) / self.jump_distance ) * 15)
+            self.jump_heights.append(jump_y)
+            self.jump_angles.append(jump_angle)
+            if jump_y > 0 and jump_angle not in self.rotated_images:
+                self.rotated_images[jump_angle] = pygame.transform.rotate(self.image, jump_angle)
+        self.tables_key = (self.image, self.jump_distance, self.rect.h)
+    
+    def draw(self, screen: pygame.Surface) -> list[pygame.Rect]:
         """ 
         Draw the player to a surface
         Args:
             screen (pygame.Surface): The surface to draw the player on
+        Returns:
+            list[pygame.Rect]: The regions drawn
         """
+        if self.tables_key != (self.image, self.jump_distance, self.rect.h):
+            self.build_tables()
         swing_y = 2 * math.sin(time.time() * 3)
-        # Calcula la altura del salto basandose en el seno de jump_timer restringido en [ 0, pi ]
-        jump_y = self.rect.h * math.sin( math.pi * float(self.jump_timer) / self.jump_distance )
-        # Calcula el angulo del jugador basandose en el seno de jump_timer restringido en [ 0, 2 * pi ] subida y bajada
-        jump_angle = round(math.sin( math.pi * 2 * float(self.jump_timer) / self.jump_distance ) * 15)
-        rot_image = None
-        rot_rect = self.rect
-        if jump_y > 0:
-            rot_image = self.image.copy()
-            rot_image = pygame.transform.rotate(self.image, jump_angle)
-            rot_rect = rot_image.get_rect(center=self.rect.center)
-        else:
-            rot_rect = self.image.get_rect(center=self.rect.center)
-            rot_image = self.image
-        pygame.draw.ellipse(screen, (92, 19, 19), (self.rect.x + 2, self.y + self.rect.h - 3 + swing_y, self.rect.w-4, 4))
+        timer = min(self.jump_timer, self.jump_distance)
+        jump_y = self.jump_heights[timer]
+        rot_image = self.rotated_images[self.jump_angles[timer]] if jump_y > 0 else self.image
+        # same placement as get_rect(center=self.rect.center)
+        rot_x = self.rect.centerx - rot_image.get_width() // 2
+        rot_y = self.rect.centery - rot_image.get_height() // 2
+        drawn = [pygame.draw.ellipse(screen, (92, 19, 19), (self.rect.x + 2, self.y + self.rect.h - 3 + swing_y, self.rect.w-4, 4))]
         if self.damaged_timer % 2 == 0:
-            screen.blit(rot_image, (rot_rect.x, round(rot_rect.y - jump_y + swing_y), rot_rect.w, rot_rect.h))
\ No newline at end of file
+            drawn.append(screen.blit(rot_image, (rot_x, round(rot_y - jump_y + swing_y))))
+        return drawn
\ No newline at end of file
@@ -1,19 +1,21 @@
-""" Module for defining a 2D point with an optional obstacle reference """
+""" Module for defining a 2D point """
+
+import math
 
 class Point:
     """
     A 2d vector for an easy lookup of obstacles
     """
-    def __init__(self, x = 0, y = 0, obstacle = None):
+    __slots__ = ("x", "y")
+
+    def __init__(self, x = 0, y = 0):
         """
         Args:
             x (int): The x coordinate
             y (int): The y coordinate
-            obstacle (Obstacle): The obstacle this point represents
         """
         self.x = x
         self.y = y
-        self.obstacle = obstacle
     
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y 
@@ -30,4 +32,40 @@ class Point:
             return self.x < other.x
     
     def __repr__(self):
-        return f"{(self.x, self.y)}"
\ No newline at end of file
+        return f"{(self.x, self.y)}"
+
+def as_tuple(point: Point) -> tuple:
+    """
+    Returns the (x, y) tuple of a point, it sorts exactly like the point does
+    but compares in C, for trees built with a key function
+    Args:
+        point (Point): The point
+    Returns:
+        tuple: The (x, y) key
+    """
+    return (point.x, point.y)
+
+# Packed keys keep y in the low bits, offset so negative values still sort right
+Y_BITS = 32
+Y_OFFSET = 1 << (Y_BITS - 1)
+
+def pack(point: Point) -> int:
+    """
+    Packs a point into a single int that sorts exactly like the point does,
+    for trees keyed by plain integers
+    Args:
+        point (Point): The point, with integer coordinates fitting in 32 bits
+    Returns:
+        int: The packed key, fits in a signed 64 bit integer
+    """
+    x = point.x
+    y = point.y
+    # bounds like Point(x, -inf) pack to the ends of the y range,
+    # rounding x inwards so they still fall on the same side of every integer point
+    if y == float("-inf"):
+        x = math.ceil(x)
+        y = -Y_OFFSET
+    elif y == float("inf"):
+        x = math.floor(x)
+        y = Y_OFFSET - 1
+    return (int(x) << Y_BITS) | (int(y) + Y_OFFSET)
@@ -1,5 +1,6 @@
 import pygame
 from enum import Enum
+from functools import lru_cache
 
 class Font(Enum):
     """ Preloaded fonts """
@@ -14,4 +15,19 @@ class Image(Enum):
     LOSE = pygame.image.load("img/msg-lose.png")
     PETRO = pygame.image.load("img/petro.png")
     EVIL_TAXI = pygame.transform.flip(pygame.image.load("img/taxi.png").convert_alpha(), True, False) 
-    EVIL_BUS = pygame.transform.flip(pygame.image.load("img/luna-bus.png").convert_alpha(), True, False) 
\ No newline at end of file
+    EVIL_BUS = pygame.transform.flip(pygame.image.load("img/luna-bus.png").convert_alpha(), True, False) 
+
+@lru_cache(maxsize=64)
+def render_text(text: str, color: tuple, antialias: bool = False, font: Font = Font.NJ) -> pygame.Surface:
+    """ 
+    Renders a line of text, remembering the most recently used surfaces so unchanged text is never rasterized twice.
+    The returned surface is shared, don't draw on it.
+    Args:
+        text (str): The text to render
+        color (tuple): The text color
+        antialias (bool): Whether to smooth the glyph edges
+        font (Font): The preloaded font to use
+    Returns:
+        pygame.Surface: The rendered text
+    """
+    return font.value.render(text, antialias, color)
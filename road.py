@@ -4,12 +4,14 @@ import pygame
 
 class Road(pygame.sprite.Sprite):
     """ Road class, handles the road drawing and logic """
-    def __init__(self, screen_width: int = 0, length: int = 5):
+    def __init__(self, screen_width: int = 0, length: int = 5, background: pygame.Surface = None, background_pos: tuple[int, int] = (0, 0)):
         """ 
         Road constructor
         Args:
             screen_width (int): The width of the screen
             length (int): The length of the road in chunks
+            background (pygame.Surface, optional): A still image drawn behind the road
+            background_pos (tuple[int, int]): Where the background goes on screen
         """
         pygame.sprite.Sprite.__init__(self)
         self.image = pygame.image.load("img/calle.png").convert_alpha()
@@ -19,6 +21,11 @@ class Road(pygame.sprite.Sprite):
         self.offset = 0
         self.screen_width = screen_width
         self.completeness = 0
+        self.background = background
+        self.background_pos = background_pos
+        self.backdrop = None
+        self.strip = None
+        self.layers_key = None
     
     def update(self, *args, **kwargs):
         """ Update road's main logic """
@@ -29,19 +36,34 @@ class Road(pygame.sprite.Sprite):
         """ Get the road length in pixels """
         return self.length * self.rect.w
     
+    def build_layers(self):
+        """ 
+        Pre-composites what the road draws into display format surfaces:
+        the background, and a strip of chunks one chunk wider than the screen to scroll over
+        """
+        self.backdrop = self.background.convert_alpha() if self.background else None
+        chunk_w = int(self.rect.w)
+        strip = pygame.Surface((self.screen_width + chunk_w, self.rect.h), pygame.SRCALPHA)
+        for x in range(0, strip.get_width(), chunk_w):
+            strip.blit(self.image, (x, 0))
+        self.strip = strip.convert_alpha()
+    
     def draw(self, screen: pygame.Surface):
         """
         Draw the road to a surface
         Args:
             screen (pygame.Surface): The surface to draw the road on
         """
-        start = -1
-        stop = self.screen_width // self.rect.w + 1
-        # draw just the sufficient chunks
-        for i in range(start, stop):
-            # wrap the x to the screen domain and
-            # maintain any movement smooth
-            x = int(-self.offset) % int(self.rect.w) + i * int(self.rect.w)
-            screen.blit(self.image, (x, self.rect.y))
+        layers_key = (screen.get_size(), self.screen_width, self.length, self.image, self.background)
+        if layers_key != self.layers_key:
+            self.build_layers()
+            self.layers_key = layers_key
+        if self.backdrop:
+            screen.blit(self.backdrop, self.background_pos)
+        # wrap the offset to the chunk width and
+        # maintain any movement smooth
+        chunk_w = int(self.rect.w)
+        scroll = -(int(-self.offset) % chunk_w) % chunk_w
+        screen.blit(self.strip, (0, self.rect.y), (scroll, 0, self.screen_width, self.rect.h))
         screen.blit(self.goal_image, (-self.offset + self.length * self.rect.w, self.rect.y))
-        screen.blit(self.goal_image, (-self.offset, self.rect.y))
\ No newline at end of file
+        screen.blit(self.goal_image, (-self.offset, self.rect.y))
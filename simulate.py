@@ -0,0 +1,194 @@
+"""
+Headless simulation of the game logic.
+
+Runs the same update path as main.py without a window, rendering or frame limiting,
+driven by a scripted or recorded input stream::
+
+    python simulate.py data.json --inputs run.json
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import argparse
+import json
+import time
+import pygame
+
+# Same logical resolution as main.py, the lanes and the visible window depend on it
+SCREEN_WIDTH = 138
+SCREEN_HEIGHT = 224
+
+# ------------------------------------------------
+# Pygame init
+# ------------------------------------------------
+
+pygame.init()
+pygame.font.init()
+# images are converted on load, which needs a display even if nothing is ever shown
+if pygame.display.get_surface() is None:
+    pygame.display.set_mode((1, 1))
+
+import game
+from orderedindex import BACKENDS
+from player import MAX_LANES
+
+# ------------------------------------------------
+# Input streams
+# ------------------------------------------------
+
+def load_inputs(path: str) -> list[tuple[int, str]]:
+    """
+    Read a recorded input stream
+    Args:
+        path (str): The file to read
+    Returns:
+        list[tuple[int, str]]: The (tick, key name) pairs
+    """
+    with open(path, 'r') as file:
+        return [(tick, key) for tick, key in json.load(file)["inputs"]]
+
+def save_inputs(path: str, inputs: list[tuple[int, str]]):
+    """
+    Write an input stream to disk
+    Args:
+        path (str): The file to write
+        inputs (list[tuple[int, str]]): The (tick, key name) pairs
+    """
+    with open(path, 'w') as file:
+        json.dump({"inputs": [list(pair) for pair in inputs]}, file, indent=4)
+
+def scripted(inputs: list[tuple[int, str]]):
+    """
+    Wraps an input stream as a policy
+    Args:
+        inputs (list[tuple[int, str]]): The (tick, key name) pairs
+    Returns:
+        callable: A policy returning the key names pressed on each tick
+    """
+    by_tick: dict[int, list[str]] = {}
+    for tick, key in inputs:
+        by_tick.setdefault(tick, []).append(key)
+    return lambda tick: by_tick.get(tick, ())
+
+# ------------------------------------------------
+# Strategies
+# ------------------------------------------------
+
+def always_jump(tick: int) -> tuple[str, ...]:
+    """ Policy that jumps again as soon as the player lands """
+    return () if game.player.jumping else ("space",)
+
+def ticks_until_hit(lane: int, horizon: int):
+    """
+    Looks ahead along a lane for the next obstacle the player would run into
+    Args:
+        lane (int): The lane to probe
+        horizon (int): How many ticks to look ahead
+    Returns:
+        Optional[int]: The ticks left before the hit, None if the lane is clear
+    """
+    player = game.player
+    x = player.rect.centerx + game.road.offset
+    # same probe as game.update, at the spot the player settles on in that lane
+    y = lane * player.rect.h + game.road.rect.y - (player.rect.h // 2 - 4) + player.rect.h - 4
+    for ahead in range(horizon):
+        if game.lanes.hit(x + ahead * game.player_velocity, y) is not None:
+            return ahead
+    return None
+
+def dodge(tick: int) -> tuple[str, ...]:
+    """
+    Greedy lookahead policy: stays in its lane while it is clear, otherwise moves to the
+    neighbouring lane that stays clear the longest, and jumps when there is nowhere to go
+    """
+    player = game.player
+    if player.jumping:
+        return ()
+    horizon = player.jump_distance
+    danger = ticks_until_hit(player.lane, horizon)
+    if danger is None:
+        return ()
+    best_key, best_clear = None, danger
+    for key, lane in (("up", player.lane - 1), ("down", player.lane + 1)):
+        if 0 <= lane < MAX_LANES:
+            clear = ticks_until_hit(lane, horizon)
+            clear = horizon if clear is None else clear
+            if clear > best_clear:
+                best_key, best_clear = key, clear
+    # switching lanes takes a few ticks to settle, jump if the hit comes first
+    if best_key is not None and danger > 2:
+        return (best_key,)
+    if danger <= 2:
+        return ("space",)
+    return ()
+
+STRATEGIES = {
+    "idle": lambda tick: (),
+    "always-jump": always_jump,
+    "dodge": dodge,
+}
+
+# ------------------------------------------------
+# Simulation
+# ------------------------------------------------
+
+initialized = False
+
+def init():
+    """ Initialize the game's general variables once, at the same resolution as main.py """
+    global initialized
+    # --- Global decl end ---
+    if not initialized:
+        game.init(SCREEN_WIDTH=SCREEN_WIDTH, SCREEN_HEIGHT=SCREEN_HEIGHT)
+        initialized = True
+
+def run(level: str = "data.json", policy = None, max_ticks: int = 100_000) -> dict:
+    """
+    Plays a level from start to end without rendering
+    Args:
+        level (str): The level file
+        policy (callable, optional): Takes the current tick and returns the key names pressed on it, None presses nothing
+        max_ticks (int): Give up after this many ticks
+    Returns:
+        dict: The outcome, HP, completeness, ticks and ticks per second of the run
+    """
+    init()
+    game.load_level(level)
+    game.player.reset()
+    game.goto_play()
+
+    start = time.perf_counter()
+    while game.game_state == game.State.PLAYING and game.play_ticks < max_ticks:
+        if policy is not None:
+            for key in policy(game.play_ticks):
+                game.event_update(pygame.event.Event(pygame.KEYDOWN, key=pygame.key.key_code(key)))
+        game.update()
+        game.post_update()
+    elapsed = time.perf_counter() - start
+
+    outcome = {game.State.WINNER: "win", game.State.GAMEOVER: "gameover"}.get(game.game_state, "timeout")
+    return {
+        "level": level,
+        "outcome": outcome,
+        "hp": game.player.HP,
+        "completeness": game.road.completeness,
+        "ticks": game.play_ticks,
+        "ticks_per_second": round(game.play_ticks / elapsed) if elapsed > 0 else 0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("level", nargs="?", default="data.json")
+    parser.add_argument("--inputs", help="recorded input stream, see main.py --record")
+    parser.add_argument("--strategy", choices=STRATEGIES, default="idle", help="policy used when no inputs are given")
+    parser.add_argument("--max-ticks", type=int, default=100_000)
+    parser.add_argument("--index", choices=BACKENDS, help="obstacle index backend, overrides the level's index_backend")
+    args = parser.parse_args()
+    game.index_backend_override = args.index
+    policy = scripted(load_inputs(args.inputs)) if args.inputs else STRATEGIES[args.strategy]
+    print(json.dumps(run(args.level, policy, args.max_ticks), indent=4))
+
+if __name__ == "__main__":
+    main()
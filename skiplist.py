@@ -0,0 +1,208 @@
+""" Module for an ordered index kept as a skip list """
+
+import random
+from typing import Optional
+
+from orderedindex import OrderedIndex, sorted_unique
+
+class SkipNode:
+    """ Node of a skip list, it is its own cursor """
+    __slots__ = ("value", "forward", "width", "backward")
+
+    def __init__(self, value, levels: int):
+        """
+        Args:
+            value (Any): The value of the node
+            levels (int): How many levels the node takes part in
+        """
+        self.value = value
+        self.forward: list[Optional["SkipNode"]] = [None] * levels
+        # how many nodes each link skips over, itself included, only kept for the links to a node
+        self.width = [0] * levels
+        self.backward: Optional["SkipNode"] = None
+
+    def next(self) -> Optional["SkipNode"]:
+        """ Returns the next node """
+        return self.forward[0]
+
+    def prev(self) -> Optional["SkipNode"]:
+        """ Returns the previous node """
+        return self.backward
+
+class SkipList(OrderedIndex):
+    """
+    Ordered index kept as a skip list: a sorted linked list with express lanes on top.
+    Each node climbs one more level with probability p, searches start on the highest lane and drop down.
+    Inserts and deletes only relink a handful of pointers, nothing is ever rebalanced.
+    Every link knows how many nodes it skips, so rank, select and counts add them up in O(log n).
+    """
+    # Chance of a node climbing to the next level, and the highest level
+    p: float = 0.25
+    max_level: int = 32
+
+    def __init__(self, extent = None, lo_key = None, seed = None):
+        """
+        Args:
+            extent (callable, optional): See orderedindex.OrderedIndex
+            lo_key (callable, optional): See orderedindex.OrderedIndex
+            seed (int, optional): Seeds the level picks, for reproducible layouts
+        """
+        super().__init__(extent, lo_key)
+        self.random = random.Random(seed)
+        self.clear()
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def clear(self):
+        # the head only holds the lanes, its value is never read
+        self.head = SkipNode(None, self.max_level)
+        self.level = 1
+        self.length = 0
+        self.version += 1
+
+    def random_level(self) -> int:
+        """ Picks how many levels a new node takes part in """
+        level = 1
+        while level < self.max_level and self.random.random() < self.p:
+            level += 1
+        return level
+
+    def __predecessors(self, item) -> tuple[list[SkipNode], list[int]]:
+        """ Returns, for every level, the last node before item and its position, the head being 0 """
+        update = [self.head] * self.max_level
+        positions = [0] * self.max_level
+        node = self.head
+        position = 0
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and following.value < item:
+                position += node.width[level]
+                node = following
+                following = node.forward[level]
+            update[level] = node
+            positions[level] = position
+        return (update, positions)
+
+    def insert(self, item) -> bool:
+        update, positions = self.__predecessors(item)
+        following = update[0].forward[0]
+        if following is not None and following.value == item:
+            return False
+        levels = self.random_level()
+        if levels > self.level:
+            self.level = levels
+        node = SkipNode(item, levels)
+        position = positions[0] + 1
+        for level in range(levels):
+            node.forward[level] = update[level].forward[level]
+            update[level].forward[level] = node
+            # the link is cut in two around the new node
+            node.width[level] = positions[level] + update[level].width[level] + 1 - position
+            update[level].width[level] = position - positions[level]
+        for level in range(levels, self.level):
+            update[level].width[level] += 1
+        node.backward = update[0] if update[0] is not self.head else None
+        if node.forward[0] is not None:
+            node.forward[0].backward = node
+        self.length += 1
+        return True
+
+    def remove(self, item) -> bool:
+        update, _ = self.__predecessors(item)
+        node = update[0].forward[0]
+        if node is None or not node.value == item:
+            return False
+        for level in range(len(node.forward)):
+            update[level].forward[level] = node.forward[level]
+            update[level].width[level] += node.width[level] - 1
+        for level in range(len(node.forward), self.level):
+            update[level].width[level] -= 1
+        if node.forward[0] is not None:
+            node.forward[0].backward = node.backward
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.length -= 1
+        return True
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[SkipNode]:
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and ((following.value < item) if inclusive else not (item < following.value)):
+                node = following
+                following = node.forward[level]
+        return node.forward[0]
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[SkipNode]:
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and (not (item < following.value) if inclusive else (following.value < item)):
+                node = following
+                following = node.forward[level]
+        return node if node is not self.head else None
+
+    def first(self) -> Optional[SkipNode]:
+        return self.head.forward[0]
+
+    def last(self) -> Optional[SkipNode]:
+        node = self.head
+        for level in range(self.level - 1, -1, -1):
+            while node.forward[level] is not None:
+                node = node.forward[level]
+        return node if node is not self.head else None
+
+    def __count_lower(self, item, inclusive: bool) -> int:
+        """ Counts the values lower than item, or lower or equal if inclusive """
+        node = self.head
+        position = 0
+        for level in range(self.level - 1, -1, -1):
+            following = node.forward[level]
+            while following is not None and (not (item < following.value) if inclusive else (following.value < item)):
+                position += node.width[level]
+                node = following
+                following = node.forward[level]
+        return position
+
+    def rank(self, item) -> int:
+        return self.__count_lower(item, False)
+
+    def select(self, k: int) -> Optional[SkipNode]:
+        if not 0 <= k < self.length:
+            return None
+        # the k-th value is at position k + 1, after the head
+        node = self.head
+        position = 0
+        for level in range(self.level - 1, -1, -1):
+            while node.forward[level] is not None and position + node.width[level] <= k + 1:
+                position += node.width[level]
+                node = node.forward[level]
+        return node
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        stop = self.length if hi is None else self.__count_lower(hi, inclusive[1])
+        start = 0 if lo is None else self.__count_lower(lo, not inclusive[0])
+        return max(0, stop - start)
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        items = sorted_unique(iterable, presorted)
+        self.clear()
+        # appending in order, the last node of every level is all the bookkeeping needed
+        tails = [self.head] * self.max_level
+        tail_positions = [0] * self.max_level
+        previous = None
+        for position, item in enumerate(items, 1):
+            levels = self.random_level()
+            node = SkipNode(item, levels)
+            for level in range(levels):
+                tails[level].forward[level] = node
+                tails[level].width[level] = position - tail_positions[level]
+                tails[level] = node
+                tail_positions[level] = position
+            node.backward = previous
+            previous = node
+            if levels > self.level:
+                self.level = levels
+        self.length = len(items)
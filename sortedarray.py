@@ -0,0 +1,130 @@
+""" Module for an ordered index kept as a single sorted list """
+
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from orderedindex import OrderedIndex, sorted_unique
+
+class SortedArrayCursor:
+    """ Cursor to a position of a SortedArray """
+    __slots__ = ("values", "position")
+
+    def __init__(self, values: list, position: int):
+        self.values = values
+        self.position = position
+
+    @property
+    def value(self):
+        return self.values[self.position]
+
+    def next(self) -> Optional["SortedArrayCursor"]:
+        """ Returns the cursor to the next value """
+        if self.position + 1 < len(self.values):
+            return SortedArrayCursor(self.values, self.position + 1)
+        return None
+
+    def prev(self) -> Optional["SortedArrayCursor"]:
+        """ Returns the cursor to the previous value """
+        if self.position > 0:
+            return SortedArrayCursor(self.values, self.position - 1)
+        return None
+
+    def __eq__(self, other):
+        return isinstance(other, SortedArrayCursor) and self.values is other.values and self.position == other.position
+
+    def __hash__(self):
+        return hash((id(self.values), self.position))
+
+class SortedArray(OrderedIndex):
+    """
+    Ordered index over one sorted Python list, searched with bisect.
+    Searches and scans are as cheap as it gets, inserts and deletes shift the whole tail of the list,
+    which suits the play mode where the level is loaded once and then only read.
+    """
+    def __init__(self, extent = None, lo_key = None):
+        """
+        Args:
+            extent (callable, optional): See orderedindex.OrderedIndex
+            lo_key (callable, optional): See orderedindex.OrderedIndex
+        """
+        super().__init__(extent, lo_key)
+        self.values = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __cursor(self, position: int) -> Optional[SortedArrayCursor]:
+        if 0 <= position < len(self.values):
+            return SortedArrayCursor(self.values, position)
+        return None
+
+    def insert(self, item) -> bool:
+        values = self.values
+        i = bisect_left(values, item)
+        if i < len(values) and values[i] == item:
+            return False
+        values.insert(i, item)
+        return True
+
+    def remove(self, item) -> bool:
+        values = self.values
+        i = bisect_left(values, item)
+        if i < len(values) and values[i] == item:
+            del values[i]
+            return True
+        return False
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[SortedArrayCursor]:
+        return self.__cursor(bisect_left(self.values, item) if inclusive else bisect_right(self.values, item))
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[SortedArrayCursor]:
+        return self.__cursor((bisect_right(self.values, item) if inclusive else bisect_left(self.values, item)) - 1)
+
+    def first(self) -> Optional[SortedArrayCursor]:
+        return self.__cursor(0)
+
+    def last(self) -> Optional[SortedArrayCursor]:
+        return self.__cursor(len(self.values) - 1)
+
+    def clear(self):
+        self.values = []
+        self.version += 1
+
+    def rank(self, item) -> int:
+        return bisect_left(self.values, item)
+
+    def select(self, k: int) -> Optional[SortedArrayCursor]:
+        return self.__cursor(k)
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        values = self.values
+        start = 0
+        if lo is not None:
+            start = bisect_left(values, lo) if inclusive[0] else bisect_right(values, lo)
+        stop = len(values)
+        if hi is not None:
+            stop = bisect_right(values, hi) if inclusive[1] else bisect_left(values, hi)
+        return max(0, stop - start)
+
+    def range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """ Same as orderedindex.OrderedIndex.range, served straight from the list """
+        values = self.values
+        start = 0
+        if lo is not None:
+            start = bisect_left(values, lo) if inclusive[0] else bisect_right(values, lo)
+        stop = len(values)
+        if hi is not None:
+            stop = bisect_right(values, hi) if inclusive[1] else bisect_left(values, hi)
+        if reverse:
+            for i in range(stop - 1, start - 1, -1):
+                yield values[i]
+        else:
+            for i in range(start, stop):
+                yield values[i]
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        self.values = sorted_unique(iterable, presorted)
+        self.version += 1
+
+    def LIR_list(self) -> list:
+        return list(self.values)
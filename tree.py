@@ -1,9 +1,8 @@
 """ Module for defining a balanced binary search tree with visualization capabilities """
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as pat
-from matplotlib.animation import FuncAnimation
+from collections import deque
 from typing import Optional, Any
+from orderedindex import OrderedIndex, sorted_unique
 
 class Node:
     """ Node of a Binary Search Tree """
@@ -11,15 +10,24 @@ class Node:
     left: Optional["Node"] = None
     right: Optional["Node"] = None
     value: Any = 0
+    # What the tree compares, the value itself unless the tree has a key function
+    key: Any = 0
     height: int = 1
+    # Order statistics, the amount of nodes in the subtree rooted here
+    size: int = 1
+    # Interval augmentation, only used by trees built with an extent function
+    extent: Any = None
+    max_extent: Any = None
 
-    def __init__(self, value):
+    def __init__(self, value, key = None):
         """ 
         Node constructor
         Args:
             value (Any): The value of the node
+            key (Any, optional): The precomputed sort key of the value, None to compare the value itself
         """
         self.value = value
+        self.key = value if key is None else key
     
     def prev(self) -> Optional["Node"]:
         """ 
@@ -74,10 +82,22 @@ class Node:
         return self.left != None and self.right != None
     
     def update_height(self):
-        """ Updates the height of the node """
+        """ Updates the height of the node, along with its augmented data """
         left_h = self.left.height if self.left else 0
         right_h = self.right.height if self.right else 0
         self.height = 1 + max(left_h, right_h)
+        self.size = 1 + (self.left.size if self.left else 0) + (self.right.size if self.right else 0)
+        if self.extent is not None:
+            self.update_extent()
+
+    def update_extent(self):
+        """ Updates the highest extent found in the subtree rooted at this node """
+        max_extent = self.extent
+        if self.left and max_extent < self.left.max_extent:
+            max_extent = self.left.max_extent
+        if self.right and max_extent < self.right.max_extent:
+            max_extent = self.right.max_extent
+        self.max_extent = max_extent
 
     def balance_factor(self) -> int:
         """ Returns the balance factor of the node """
@@ -88,10 +108,115 @@ class Node:
     def __str__(self):
         return f"{self.value}[{self.balance_factor()}]"
 
-class Tree:
-    """ Binary Search Tree """
+# ------------------------------------------------
+# Shape encoding
+# ------------------------------------------------
+
+def shape_of(root, count: int, values: Optional[list] = None) -> bytes:
+    """
+    Encodes the shape of a tree made of nodes with left, right and value, see Tree.shape
+    Args:
+        root (Any): The root node, None for an empty tree
+        count (int): How many nodes the tree holds, the walk never goes further
+        values (Optional[list]): Receives the values in pre-order when given
+    Returns:
+        bytes: The shape, one digit per node in pre-order
+    Raises:
+        ValueError: If the walk meets more nodes than count, which only happens when another thread edits the tree
+    """
+    digits = bytearray()
+    stack = [root] if root else []
+    while stack:
+        if len(digits) == count:
+            raise ValueError("the tree changed while its shape was taken")
+        node = stack.pop()
+        digits.append(48 + (node.left is not None) + 2 * (node.right is not None))
+        if values is not None:
+            values.append(node.value)
+        if node.right:
+            stack.append(node.right)
+        if node.left:
+            stack.append(node.left)
+    return bytes(digits)
+
+def shape_links(shape: bytes):
+    """
+    Decodes a shape, see Tree.shape: yields where each node hangs, in pre-order.
+    Right children wait on a stack until the left subtree before them is done.
+    Args:
+        shape (bytes): The shape
+    Yields:
+        (int, bool): The pre-order index of the parent and whether the node is its left child, (-1, False) for the root
+    Raises:
+        ValueError: If the shape is malformed
+    """
+    pending = None
+    waiting = []
+    for i, digit in enumerate(shape):
+        flags = digit - 48
+        if not 0 <= flags <= 3:
+            raise ValueError(f"invalid shape digit {chr(digit)!r}")
+        if pending is not None:
+            yield pending
+        elif i == 0:
+            yield (-1, False)
+        else:
+            raise ValueError("the shape has nodes past the end of the tree")
+        if flags & 2:
+            waiting.append(i)
+        if flags & 1:
+            pending = (i, True)
+        elif waiting:
+            pending = (waiting.pop(), False)
+        else:
+            pending = None
+    if pending is not None:
+        raise ValueError("the shape ends before the tree does")
+
+class Tree(OrderedIndex):
+    """ 
+    Binary Search Tree, the AVL backend of orderedindex.OrderedIndex
+    Attributes:
+        root (Optional[Node]): The root node
+        version (int): Bumped on every mutation, lets cursors held outside the tree know they went stale
+        extent (Optional[callable]): Maps a value to the end of the interval it spans, enables overlap queries
+        key (Optional[callable]): Maps a value to the key the tree compares, like point.as_tuple
+    """
     root: Optional["Node"] = None
 
+    def __init__(self, extent = None, lo_key = None, key = None):
+        """
+        Tree constructor
+        Args:
+            extent (callable, optional): Maps each value to the end of the interval it spans, the value itself being the start.
+                When given every node keeps the highest extent of its subtree, turning this into an interval tree.
+            lo_key (callable, optional): Accepted for interface parity, the interval augmentation doesn't need it
+            key (callable, optional): Maps each value to a key sorting like it, computed once per node.
+                Tuples or ints compare in C, much faster than values with Python level operators like Point.
+                Searches and bounds take values as usual, their key is taken once per call.
+        """
+        super().__init__(extent, lo_key)
+        self.key = key
+        # materialized traversals, by traversal name, with the version they were taken at
+        self.__lists: dict[str, tuple[int, list]] = {}
+
+    def key_of(self, item) -> Any:
+        """ Returns what the tree compares for an item """
+        return item if self.key is None else self.key(item)
+
+    def new_node(self, item) -> Node:
+        """
+        Creates a detached node for the item, with its augmented data filled
+        Args:
+            item (Any): The value of the node
+        Returns:
+            Node: The new node
+        """
+        node = Node(item, None if self.key is None else self.key(item))
+        if self.extent is not None:
+            node.extent = node.max_extent = self.extent(item)
+        return node
+
     def search_closer(self, item, cmp_func = None) -> tuple[Optional[Node], bool]:
         """
         Search but return allways
@@ -110,27 +235,24 @@ class Tree:
             return (None, False)
         node = self.root
         if cmp_func != None:
-            while node != None:
-                if cmp_func(node.value) == 0:
+            while True:
+                result = cmp_func(node.value)
+                if result == 0:
                     return (node, True)
-                elif cmp_func(node.value) < 0 and node.left != None:
-                    node = node.left
-                elif cmp_func(node.value) > 0 and node.right != None:
-                    node = node.right
-                else:
+                child = node.left if result < 0 else node.right
+                if child is None:
                     return (node, False)
-            return (None, False)
+                node = child
         else:
-            while node != None:
-                if (item == node.value):
+            item = self.key_of(item)
+            while True:
+                key = node.key
+                if item == key:
                     return (node, True)
-                elif (item < node.value and node.left != None):
-                    node = node.left
-                elif (item > node.value and node.right != None):
-                    node = node.right
-                else:
+                child = node.left if item < key else node.right
+                if child is None:
                     return (node, False)
-            return (None, False)
+                node = child
 
     def search(self, item) -> Optional[Node]:
         """ 
@@ -227,50 +349,72 @@ class Tree:
 
     def rebalance(self, node: Node):
         """ 
-        Rebalances the tree from the given node upwards
+        Rebalances the tree from the given node upwards.
+        Stops as soon as a subtree keeps the height it had before the change, ancestors can't be affected past that point.
         Args:
             node (Node): The node to start rebalancing from
         """
-        if node == None:
-            return
-        node.update_height()
-        balance = node.balance_factor()
-        # LL
-        if balance > 1 and node.left.balance_factor() >= 0:
-            node = self.rotate_right(node)
-        # RR
-        elif balance < -1 and node.right.balance_factor() <= 0:
-            node = self.rotate_left(node)
-        # LR
-        elif balance > 1 and node.left.balance_factor() < 0:
-            self.rotate_left(node.left)
-            node = self.rotate_right(node)
-        # RL
-        elif balance < -1 and node.right.balance_factor() > 0:
-            self.rotate_right(node.right)
-            node = self.rotate_left(node)
-        self.rebalance(node.parent)
+        while node != None:
+            old_height = node.height
+            node.update_height()
+            balance = node.balance_factor()
+            # LL / LR
+            if balance > 1:
+                if node.left.balance_factor() < 0:
+                    self.rotate_left(node.left)
+                node = self.rotate_right(node)
+            # RR / RL
+            elif balance < -1:
+                if node.right.balance_factor() > 0:
+                    self.rotate_right(node.right)
+                node = self.rotate_left(node)
+            if node.height == old_height:
+                break
+            node = node.parent
+        if node != None:
+            self.propagate(node.parent)
+
+    def propagate(self, node: Node):
+        """ 
+        Refreshes the augmented data from the given node up to the root.
+        Subtree sizes change all the way up on every insertion or removal, so this can't stop early.
+        Heights must already be right, this never rotates.
+        Args:
+            node (Node): The node to start from
+        """
+        intervals = self.extent is not None
+        while node is not None:
+            left = node.left
+            right = node.right
+            node.size = 1 + (left.size if left else 0) + (right.size if right else 0)
+            if intervals:
+                node.update_extent()
+            node = node.parent
     
-    def add(self, *args):
+    def insert(self, item) -> bool:
         """ 
-        Add only if not exists
+        Add a single item only if not exists, see add
         Args:
-            *args (Any): The items to add
-        """
-        for item in args:
-            target = self.search_closer(item)
-            if target[0] == None: # Tree is empty
-                self.root = Node(item)
-                self.root.parent = None
-            elif not target[1]: # Not found
-                parent = target[0]
-                if item < parent.value:
-                    parent.left = Node(item)
-                    parent.left.parent = parent
-                else:
-                    parent.right = Node(item)
-                    parent.right.parent = parent
-                self.rebalance(parent)
+            item (Any): The item to add
+        Returns:
+            bool: True if the item was added
+        """
+        target = self.search_closer(item)
+        if target[0] == None: # Tree is empty
+            self.root = self.new_node(item)
+            self.root.parent = None
+            return True
+        elif not target[1]: # Not found
+            parent = target[0]
+            if self.key_of(item) < parent.key:
+                parent.left = self.new_node(item)
+                parent.left.parent = parent
+            else:
+                parent.right = self.new_node(item)
+                parent.right.parent = parent
+            self.rebalance(parent)
+            return True
+        return False
     
     def __del(self, node: Node):
         # It's a leaf!
@@ -285,7 +429,11 @@ class Tree:
         elif node.has_full_capacity():
             ino = node.next()
             node.value = ino.value
+            node.key = ino.key
+            node.extent = ino.extent
             self.__del(ino)
+            # the swapped value may sit above where the removal settled
+            self.propagate(node)
         # It has one child
         else:
             child = node.left
@@ -293,6 +441,8 @@ class Tree:
                 child = node.right
             child.detach_from_parent()
             node.value = child.value
+            node.key = child.key
+            node.extent = child.extent
             node.left = child.left
             node.right = child.right
             if node.right:
@@ -301,167 +451,539 @@ class Tree:
                 node.left.parent = node
             self.rebalance(node)
     
-    def delete(self, *args):
+    def remove(self, item) -> bool:
         """
-        Delete items if they exist
+        Delete a single item if it exists, see delete
         Args:
-            *args (Any): The items to delete
+            item (Any): The item to delete
+        Returns:
+            bool: True if the item was deleted
         """
-        for item in args:
-            target = self.search(item)
-            if target != None:
-                self.__del(target)
-    
-    def __contains__(self, item):
-        return self.search(item) != None
+        target = self.search(item)
+        if target != None:
+            self.__del(target)
+            return True
+        return False
     
-    def contains(self, item) -> bool:
+    def clear(self):
+        """ Clear the tree """
+        self.root = None
+        self.version += 1
+
+    def __len__(self) -> int:
+        return self.root.size if self.root else 0
+
+    def __count_lower(self, key, inclusive: bool) -> int:
+        """ Counts the nodes whose key is lower than key, or lower or equal if inclusive """
+        count = 0
+        node = self.root
+        while node is not None:
+            if (not (key < node.key)) if inclusive else (node.key < key):
+                count += 1 + (node.left.size if node.left else 0)
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def rank(self, item) -> int:
         """
-        Check if the tree contains the item
+        Counts the values lower than item in O(log n), item doesn't need to be in the tree
         Args:
-            item (Any): The item to check for
+            item (Any): The item
         Returns:
-            bool: True if the item is in the tree, False otherwise
+            int: The amount of lower values, the index item has or would have in order
         """
-        return item in self
-    
-    def clear(self):
-        """ Clear the tree """
+        return self.__count_lower(self.key_of(item), False)
+
+    def select(self, k: int) -> Optional[Node]:
+        """
+        Returns the node holding the k-th lowest value in O(log n)
+        Args:
+            k (int): The index in order, starting at 0
+        Returns:
+            Optional[Node]: The node, or None if k is out of range
+        """
+        if k < 0 or k >= len(self):
+            return None
+        node = self.root
+        while True:
+            left = node.left.size if node.left else 0
+            if k < left:
+                node = node.left
+            elif k == left:
+                return node
+            else:
+                k -= left + 1
+                node = node.right
+
+    def count_range(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True)) -> int:
+        """
+        Counts the values between lo and hi in O(log n), without visiting them
+        Args:
+            lo (Any, optional): The lower bound, None means unbounded
+            hi (Any, optional): The upper bound, None means unbounded
+            inclusive (tuple[bool, bool], optional): Whether each bound is included
+        Returns:
+            int: The amount of values in range
+        """
+        high = len(self) if hi is None else self.__count_lower(self.key_of(hi), inclusive[1])
+        low = 0 if lo is None else self.__count_lower(self.key_of(lo), not inclusive[0])
+        return max(0, high - low)
+
+    def first(self) -> Optional[Node]:
+        """ Returns the node with the lowest value, or None if the tree is empty """
+        node = self.root
+        while node != None and node.left != None:
+            node = node.left
+        return node
+
+    def last(self) -> Optional[Node]:
+        """ Returns the node with the highest value, or None if the tree is empty """
+        node = self.root
+        while node != None and node.right != None:
+            node = node.right
+        return node
+
+    def lower_bound(self, item, inclusive: bool = True) -> Optional[Node]:
+        """
+        Returns the first node whose value is greater or equal than item
+        Args:
+            item (Any): The bound
+            inclusive (bool, optional): If False, values equal to item are skipped
+        Returns:
+            Optional[Node]: The node, or None if every value is lower
+        """
+        item = self.key_of(item)
+        found = None
+        node = self.root
+        while node is not None:
+            if (node.key < item) if inclusive else not (item < node.key):
+                node = node.right
+            else:
+                found = node
+                node = node.left
+        return found
+
+    def upper_bound(self, item, inclusive: bool = True) -> Optional[Node]:
+        """
+        Returns the last node whose value is lower or equal than item
+        Args:
+            item (Any): The bound
+            inclusive (bool, optional): If False, values equal to item are skipped
+        Returns:
+            Optional[Node]: The node, or None if every value is greater
+        """
+        item = self.key_of(item)
+        found = None
+        node = self.root
+        while node is not None:
+            if (item < node.key) if inclusive else not (node.key < item):
+                node = node.left
+            else:
+                found = node
+                node = node.right
+        return found
+
+    def irange(self, lo = None, hi = None, inclusive: tuple[bool, bool] = (True, True), reverse: bool = False):
+        """
+        Same as orderedindex.OrderedIndex.irange, comparing keys
+        """
+        lo_key = None if lo is None else self.key_of(lo)
+        hi_key = None if hi is None else self.key_of(hi)
+        if reverse:
+            node = self.last() if hi is None else self.upper_bound(hi, inclusive[1])
+            while node is not None:
+                if lo is not None and ((node.key < lo_key) if inclusive[0] else not (lo_key < node.key)):
+                    return
+                yield node
+                node = node.prev()
+        else:
+            node = self.first() if lo is None else self.lower_bound(lo, inclusive[0])
+            while node is not None:
+                if hi is not None and ((hi_key < node.key) if inclusive[1] else not (node.key < hi_key)):
+                    return
+                yield node
+                node = node.next()
+
+    def ioverlapping(self, lo, hi):
+        """
+        Lazily yields, in order, the nodes whose interval [value, extent(value)] overlaps [lo, hi].
+        Subtrees whose highest extent falls short of lo are never entered, so the cost is
+        O(log n + k) for contiguous results like the obstacles on screen.
+        The tree must not be modified while the generator is alive.
+        Args:
+            lo (Any): The lower bound, compared against extents
+            hi (Any): The upper bound, compared against values
+        Yields:
+            Node: The overlapping nodes
+        """
+        if self.extent is None:
+            raise ValueError("overlap queries need a tree built with an extent function")
+        hi = self.key_of(hi)
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                if node.max_extent < lo:
+                    node = None
+                else:
+                    stack.append(node)
+                    node = node.left
+            else:
+                node = stack.pop()
+                if hi < node.key:
+                    return
+                if not node.extent < lo:
+                    yield node
+                node = node.right
+
+    def overlapping(self, lo, hi):
+        """
+        Lazily yields, in order, the values whose interval overlaps [lo, hi]. See ioverlapping for the details.
+        Args:
+            lo (Any): The lower bound, compared against extents
+            hi (Any): The upper bound, compared against values
+        Yields:
+            Any: The overlapping values
+        """
+        for node in self.ioverlapping(lo, hi):
+            yield node.value
+
+    def bulk_load(self, iterable, presorted: bool = False):
+        """
+        Replace the tree contents with the given items, building a perfectly balanced tree in linear time.
+        Duplicates are dropped keeping the first one, just like repeated calls to add would do.
+        Args:
+            iterable (Iterable): The items to load
+            presorted (bool, optional): Skip sorting when the items already come in ascending order
+        """
+        unique = sorted_unique(iterable, presorted, self.key)
+
+        def _build(lo: int, hi: int, parent: Optional[Node]) -> Optional[Node]:
+            if lo >= hi:
+                return None
+            mid = (lo + hi) // 2
+            node = self.new_node(unique[mid])
+            node.parent = parent
+            node.left = _build(lo, mid, node)
+            node.right = _build(mid + 1, hi, node)
+            node.update_height()
+            return node
+        self.root = _build(0, len(unique), None)
+        self.version += 1
+
+    def spawn(self) -> "Tree":
+        """ Returns a new empty tree comparing and augmenting its values like this one """
+        return Tree(self.extent, self.lo_key, self.key)
+
+    def __join(self, left: Optional[Node], pivot: Node, right: Optional[Node]) -> Node:
+        """
+        Joins two detached subtrees through a detached pivot node, every key of left being lower than the pivot's
+        and every key of right greater. Costs O(|height difference|).
+        Returns:
+            Node: The root of the joined subtree
+        """
+        left_h = left.height if left else 0
+        right_h = right.height if right else 0
+        if left_h > right_h + 1:
+            # hang the pivot down the right spine of the taller tree, where the heights match
+            parent, node = None, left
+            while node is not None and node.height > right_h + 1:
+                parent, node = node, node.right
+            parent.right = pivot
+        elif right_h > left_h + 1:
+            parent, node = None, right
+            while node is not None and node.height > left_h + 1:
+                parent, node = node, node.left
+            parent.left = pivot
+        else:
+            parent = None
+        pivot.parent = parent
+        if parent is None:
+            pivot.left, pivot.right = left, right
+        elif parent.right is pivot:
+            pivot.left, pivot.right = node, right
+        else:
+            pivot.left, pivot.right = left, node
+        if pivot.left:
+            pivot.left.parent = pivot
+        if pivot.right:
+            pivot.right.parent = pivot
+        pivot.update_height()
+        if parent is None:
+            return pivot
+        # the spine grew by one level at most, same as after an insertion
+        self.rebalance(parent)
+        while pivot.parent is not None:
+            pivot = pivot.parent
+        return pivot
+
+    def __split(self, node: Optional[Node], key, inclusive: bool) -> tuple[Optional[Node], Optional[Node]]:
+        """
+        Splits a detached subtree into the nodes lower than key and the rest, joining back the pieces cut
+        along the search path. The joins cost as much as the height differences, O(log n) in total.
+        Returns:
+            (Optional[Node], Optional[Node]): The roots of the lower and the upper subtrees
+        """
+        if node is None:
+            return (None, None)
+        left, right = node.left, node.right
+        if left:
+            left.parent = None
+        if right:
+            right.parent = None
+        node.left = node.right = None
+        if (not node.key < key) if inclusive else (key < node.key):
+            lower, upper = self.__split(left, key, inclusive)
+            return (lower, self.__join(upper, node, right))
+        lower, upper = self.__split(right, key, inclusive)
+        return (self.__join(left, node, lower), upper)
+
+    def split(self, item, inclusive: bool = True) -> "Tree":
+        """
+        Moves the values greater or equal than item (greater if not inclusive) to a new tree in O(log n),
+        this tree keeps the lower ones
+        Args:
+            item (Any): Where to split, it doesn't need to be in the tree
+            inclusive (bool, optional): Whether a value equal to item moves too
+        Returns:
+            Tree: The tree with the upper values
+        """
+        # rotations only fix the root of the tree itself, keep it out of the way while the pieces are detached
+        root = self.root
         self.root = None
+        lower, upper = self.__split(root, self.key_of(item), inclusive)
+        self.root = lower
+        self.version += 1
+        other = self.spawn()
+        other.root = upper
+        return other
+
+    def join(self, other: "Tree"):
+        """
+        Moves every value of other after the values of this tree in O(log n), leaving other empty.
+        Both trees must compare and augment their values the same way, see spawn.
+        Args:
+            other (Tree): The tree to append, all its values greater than the values of this one
+        Raises:
+            ValueError: If the values of both trees interleave
+        """
+        if other.root is None:
+            return
+        if self.root is not None and not self.last().key < other.first().key:
+            raise ValueError("the trees to join overlap, every value of the appended tree must be greater")
+        # the lowest value of other becomes the node joining both trees
+        value = other.first().value
+        other.remove(value)
+        left, right = self.root, other.root
+        self.root = None
+        other.root = None
+        other.version += 1
+        self.root = self.__join(left, self.new_node(value), right)
+        self.version += 1
+
+    def shape(self) -> bytes:
+        """
+        Encodes the exact shape of the tree, to rebuild it later with restore.
+        One ASCII digit per node in pre-order: 1 if it has a left child, plus 2 if it has a right one.
+        Returns:
+            bytes: The shape, as many digits as nodes
+        """
+        return shape_of(self.root, len(self))
+
+    def restore(self, iterable, shape: bytes):
+        """
+        Replace the tree contents with a tree of the given shape, in one linear pass without rotations.
+        Values are placed in in-order, so the pair saved by LIR_list and shape comes back as the very same tree.
+        Args:
+            iterable (Iterable): The values, in ascending order
+            shape (bytes): The shape, see shape
+        Raises:
+            ValueError: If the shape is malformed, doesn't match the values or breaks the AVL invariants,
+                the tree is left untouched then
+        """
+        values = list(iterable)
+        if len(values) != len(shape):
+            raise ValueError(f"the shape has {len(shape)} nodes for {len(values)} values")
+        # link the skeleton in pre-order
+        preorder = []
+        for parent, is_left in shape_links(shape):
+            node = Node(None)
+            if parent >= 0:
+                node.parent = preorder[parent]
+                if is_left:
+                    node.parent.left = node
+                else:
+                    node.parent.right = node
+            preorder.append(node)
+        root = preorder[0] if preorder else None
+        # fill the values in in-order
+        stack = []
+        node = root
+        values_iter = iter(values)
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                value = next(values_iter)
+                node.value = value
+                node.key = value if self.key is None else self.key(value)
+                if self.extent is not None:
+                    node.extent = self.extent(value)
+                node = node.right
+        # children come after their parents in pre-order, so backwards every subtree is done before its root
+        for node in reversed(preorder):
+            node.update_height()
+        self.__validate(root)
+        self.root = root
+        self.version += 1
+
+    def validate(self):
+        """
+        Checks the AVL invariants in one linear pass: the keys strictly ascend in in-order,
+        the balance factors stay within one and the parent links match the children
+        Raises:
+            ValueError: On the first broken invariant
+        """
+        self.__validate(self.root)
+
+    def __validate(self, root: Optional[Node]):
+        # None is an empty subtree, which is always valid
+        stack = []
+        node = root
+        previous = None
+        while stack or node is not None:
+            if node is not None:
+                for child in (node.left, node.right):
+                    if child is not None and child.parent is not node:
+                        raise ValueError(f"{child.value} is not linked back to its parent")
+                if abs(node.balance_factor()) > 1:
+                    raise ValueError(f"{node.value} is out of balance")
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                if previous is not None and not previous.key < node.key:
+                    raise ValueError(f"{node.value} is out of order")
+                previous = node
+                node = node.right
+
+    def LIR_iter(self):
+        """
+        Lazily yields the values in in-order traversal, keeping only the path to the current node.
+        The tree must not be modified while the generator is alive.
+        """
+        stack = []
+        node = self.root
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node.value
+                node = node.right
+
+    def ILR_iter(self):
+        """
+        Lazily yields the values in pre-order traversal, keeping only the pending right children.
+        The tree must not be modified while the generator is alive.
+        """
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            yield node.value
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+
+    def LRI_iter(self):
+        """
+        Lazily yields the values in post-order traversal, keeping only the path to the current node.
+        The tree must not be modified while the generator is alive.
+        """
+        stack = []
+        node = self.root
+        visited = None
+        while stack or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                top = stack[-1]
+                # climb back from the left subtree into the right one, once
+                if top.right is not None and top.right is not visited:
+                    node = top.right
+                else:
+                    yield top.value
+                    visited = stack.pop()
+
+    def BREADTH_iter(self):
+        """
+        Lazily yields the values in breadth-first traversal.
+        The queue holds one level of the tree at most, about half of the nodes for the last one.
+        The tree must not be modified while the generator is alive.
+        """
+        queue = deque([self.root] if self.root else [])
+        while queue:
+            node = queue.popleft()
+            yield node.value
+            if node.left:
+                queue.append(node.left)
+            if node.right:
+                queue.append(node.right)
+
+    def __cached_list(self, traversal) -> list:
+        """ Materializes a traversal, reusing the previous result while the tree version stays the same """
+        name = traversal.__name__
+        cached = self.__lists.get(name)
+        if cached is None or cached[0] != self.version:
+            cached = (self.version, list(traversal()))
+            self.__lists[name] = cached
+        # shared with every caller until the next mutation, hence read-only
+        return cached[1]
     
     def LIR_list(self) -> list:
         """
-        Returns the in-order traversal of the tree as a list
-        """
-        arr = []
-        def _add(node: Node):
-            if (node.left):
-                _add(node.left)
-            arr.append(node.value)
-            if (node.right):
-                _add(node.right)
-        if (self.root):
-            _add(self.root)
-        return arr
+        Returns the in-order traversal of the tree as a list, cached until the next mutation.
+        The list is shared by every call until then, it must not be modified, copy it first.
+        """
+        return self.__cached_list(self.LIR_iter)
     
     def ILR_list(self) -> list:
         """
-        Returns the pre-order traversal of the tree as a list
-        """
-        arr = []
-        def _add(node: Node):
-            arr.append(node.value)
-            if (node.left):
-                _add(node.left)
-            if (node.right):
-                _add(node.right)
-        if (self.root):
-            _add(self.root)
-        return arr
+        Returns the pre-order traversal of the tree as a list, cached until the next mutation.
+        The list is shared by every call until then, it must not be modified, copy it first.
+        """
+        return self.__cached_list(self.ILR_iter)
     
     def LRI_list(self) -> list:
         """
-        Returns the post-order traversal of the tree as a list
-        """
-        arr = []
-        def _add(node: Node):
-            if (node.left):
-                _add(node.left)
-            if (node.right):
-                _add(node.right)
-            arr.append(node.value)
-        if (self.root):
-            _add(self.root)
-        return arr
+        Returns the post-order traversal of the tree as a list, cached until the next mutation.
+        The list is shared by every call until then, it must not be modified, copy it first.
+        """
+        return self.__cached_list(self.LRI_iter)
     
     def BREADTH_list(self) -> list:
         """
-        Returns the breadth-first traversal of the tree as a list
-        """
-        arr = []
-        def _add(node: Node, depth=0):
-            if (len(arr) <= depth):
-                arr.append([])
-            arr[depth].append(node.value)
-            if (node.left):
-                _add(node.left, depth + 1)
-            if (node.right):
-                _add(node.right, depth + 1)
-        if (self.root):
-            _add(self.root)
-        return [item for sublist in arr for item in sublist]
+        Returns the breadth-first traversal of the tree as a list, cached until the next mutation.
+        The list is shared by every call until then, it must not be modified, copy it first.
+        """
+        return self.__cached_list(self.BREADTH_iter)
 
 def draw_tree(tree: Tree, min_value = None, max_value = None):
     """ 
-    Draws the tree with its traversals using matplotlib
+    Shows the tree with its traversals in a viewer process, see viewer.open_viewer.
+    Returns right away, the game keeps running while the window is open.
     Args:
         tree (Tree): The tree to draw
         min_value (Any, optional): A minimum value to highlight
         max_value (Any, optional): A maximum value to highlight
+    Returns:
+        subprocess.Popen: The viewer process
     """
-    figure, axes = plt.subplots(figsize=(10, 6))
-    axes.set_axis_off()
-
-    positions = {}
-
-    def _fill(node, x=0, y=0, depth=0):
-        if node is None:
-            return
-        
-        color = "lightgray"
-        if min_value is not None and max_value is not None:
-            if node.value < max_value and node.value > min_value:
-                color = "lightgreen"
-            elif node.value == max_value or node.value == min_value:
-                color = "yellow"
-
-        positions[(node.value.x, node.value.y)] = (x, y)
-
-        if node.left:
-            axes.plot([x, x - 1/(2**depth)], [y, y - 1], 'k-') 
-            _fill(node.left, x - 1/(2**depth), y - 1, depth + 1)
-        if node.right:
-            axes.plot([x, x + 1/(2**depth)], [y, y - 1], 'k-') 
-            _fill(node.right, x + 1/(2**depth), y - 1, depth + 1)
-
-        w = 0.4 / 10
-        h = 0.4
-        axes.add_patch(pat.Rectangle((x - w / 2, y - h / 2), width=w, height=h, color=color, zorder=3))
-        axes.text(x, y, f"{node.value.x},{node.value.y}", ha="center", va="center", fontsize=7, zorder=4)
-
-    _fill(tree.root)
-
-    axes.set_xlim(-0.5, 0.5)
-    axes.text(-0.15, -1, "PRE", ha="center", va="center", fontsize=12, zorder=4, color=(1, 0, 0, 0.8))
-    axes.text(-0.05, -1, "INO", ha="center", va="center", fontsize=12, zorder=4, color=(0, 1, 0, 0.8))
-    axes.text(0.05, -1, "POS", ha="center", va="center", fontsize=12, zorder=4, color=(0, 0, 1, 0.8))
-    axes.text(0.15, -1, "Breadth", ha="center", va="center", fontsize=12, zorder=4, color=(1, 1, 0, 0.8))
-
-    h = 0.6
-    w = h / 10
-    preo_f = axes.add_patch(pat.Rectangle((0, 0), width=w, height=h, color=(1, 0, 0, 0.8), zorder=1))
-    ino_f = axes.add_patch(pat.Rectangle((0, 0), width=w, height=h, color=(0, 1, 0, 0.8), zorder=1))
-    poso_f = axes.add_patch(pat.Rectangle((0, 0), width=w, height=h, color=(0, 0, 1, 0.8), zorder=1))
-    deptho_f = axes.add_patch(pat.Rectangle((0, 0), width=w, height=h, color=(1, 1, 0, 0.8), zorder=1))
-    while plt.fignum_exists(figure.number):
-        PRE_l = tree.ILR_list()
-        INO_l = tree.LIR_list()
-        POS_l = tree.LRI_list()
-        DEP_l = tree.BREADTH_list()
-        for i in range(len(PRE_l)):
-            pos = positions[(PRE_l[i].x, PRE_l[i].y)]
-            preo_f.set_xy((pos[0] - w / 2, pos[1] - h / 2))
-
-            pos = positions[(INO_l[i].x, INO_l[i].y)]
-            ino_f.set_xy((pos[0] - w / 2, pos[1] - h / 2))
-
-            pos = positions[(POS_l[i].x, POS_l[i].y)]
-            poso_f.set_xy((pos[0] - w / 2, pos[1] - h / 2))
-
-            pos = positions[(DEP_l[i].x, DEP_l[i].y)]
-            deptho_f.set_xy((pos[0] - w / 2, pos[1] - h / 2))
-            plt.pause(0.4)
-            if not plt.fignum_exists(figure.number):
-                break
-    
-    plt.show()
\ No newline at end of file
+    import viewer
+    return viewer.open_viewer(tree, min_value, max_value)
@@ -0,0 +1,313 @@
+"""
+Out of process AVL tree viewer.
+
+The game takes a snapshot of the tree, its shape plus the obstacle positions in pre-order, and pipes it
+to a separate Python process running this module, so the matplotlib window never blocks the frame loop::
+
+    python viewer.py --output tree.png < snapshot.pickle
+
+Nodes are laid out by their in-order rank, one row per depth. Big trees are drawn with level of detail:
+the top levels are expanded breadth first until the node budget runs out, and the subtrees below are
+collapsed into a single marker with their size. Zooming in expands the subtrees that come into view.
+"""
+
+import argparse
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Optional
+
+from tree import shape_of, shape_links
+
+# Most nodes expanded at once, past it the subtrees are collapsed
+MAX_NODES = 255
+# Seconds between two steps of the traversal animation
+STEP_INTERVAL = 0.4
+# Seconds to wait before walking a tree again when an edit raced the walk
+RETRY_INTERVAL = 0.05
+
+# The viewer process currently open, see open_viewer
+current: Optional[subprocess.Popen] = None
+
+# ------------------------------------------------
+# Game side
+# ------------------------------------------------
+
+def snapshot(tree, low: Optional[int] = None, high: Optional[int] = None) -> dict:
+    """
+    Copies what the viewer needs from a tree, its shape and values in one pre-order walk, see tree.shape_of.
+    A tree edited meanwhile from another thread is walked again once the edits pause, until a walk sees a single version.
+    Args:
+        tree (Any): A tree whose nodes have value, left and right, like tree.Tree or persistenttree.PersistentTree
+        low (int, optional): The in-order rank of the lowest value to highlight
+        high (int, optional): The in-order rank of the highest value to highlight
+    Returns:
+        dict: The shape, see tree.Tree.shape, the x and y of the values in pre-order, and the highlight bounds
+    """
+    while True:
+        version = tree.version
+        values = []
+        try:
+            shape = shape_of(tree.root, len(tree), values)
+            if tree.version == version:
+                break
+        except ValueError:
+            # caught halfway through an edit
+            pass
+        time.sleep(RETRY_INTERVAL)
+    return {
+        "shape": shape,
+        "xs": array("q", [int(value.x) for value in values]),
+        "ys": array("q", [int(value.y) for value in values]),
+        "low": low,
+        "high": high,
+    }
+
+def open_viewer(tree, min_value = None, max_value = None) -> subprocess.Popen:
+    """
+    Shows a tree in a viewer process, closing the one opened before if still there.
+    Only the highlight ranks are taken on the calling thread, the tree is copied and piped in the background,
+    from an O(1) snapshot for indexes that have one, like persistenttree.PersistentTree.
+    Args:
+        tree (Any): The tree, see snapshot
+        min_value (Any, optional): The lowest value to highlight
+        max_value (Any, optional): The highest value to highlight
+    Returns:
+        subprocess.Popen: The viewer process
+    """
+    global current
+    # --- Global decl end ---
+    if current is not None and current.poll() is None:
+        current.terminate()
+    process = subprocess.Popen([sys.executable, __file__], stdin=subprocess.PIPE)
+    current = process
+    highlight = min_value is not None and max_value is not None
+    low = tree.rank(min_value) if highlight else None
+    high = tree.rank(max_value) if highlight else None
+    source = tree.snapshot() if hasattr(tree, "snapshot") else tree
+
+    def _feed():
+        try:
+            with process.stdin as pipe:
+                pipe.write(pickle.dumps(snapshot(source, low, high), pickle.HIGHEST_PROTOCOL))
+        except OSError:
+            # the viewer was closed before it got everything
+            pass
+    threading.Thread(target=_feed, name="viewer-feed", daemon=True).start()
+    return process
+
+# ------------------------------------------------
+# Viewer side
+# ------------------------------------------------
+
+class Skeleton:
+    """
+    Tree rebuilt from a snapshot as flat arrays indexed by pre-order position, the root being 0.
+    Every pass over it is iterative, deep or degenerate trees never hit the recursion limit.
+    """
+    def __init__(self, shape: bytes):
+        """
+        Args:
+            shape (bytes): The pre-order child flags, see tree.Tree.shape
+        """
+        n = len(shape)
+        self.n = n
+        self.left = array("i", [-1]) * n
+        self.right = array("i", [-1]) * n
+        self.parent = array("i", [-1]) * n
+        self.depth = array("i", [0]) * n
+        for i, (parent, is_left) in enumerate(shape_links(shape)):
+            if parent < 0:
+                continue
+            self.parent[i] = parent
+            self.depth[i] = self.depth[parent] + 1
+            if is_left:
+                self.left[parent] = i
+            else:
+                self.right[parent] = i
+        # children come after their parents in pre-order
+        self.size = array("i", [1]) * n
+        for i in range(n - 1, 0, -1):
+            self.size[self.parent[i]] += self.size[i]
+        self.rank = array("i", [0]) * n
+        for i in range(n):
+            left = self.left[i]
+            parent = self.parent[i]
+            # the subtree of i starts right after everything before it in order
+            start = 0 if parent < 0 else (self.rank[parent] + 1 if self.right[parent] == i else self.rank[parent] - self.size[i])
+            self.rank[i] = start + (self.size[left] if left >= 0 else 0)
+
+    def subtree_ranks(self, i: int) -> tuple[int, int]:
+        """ Returns the lowest and the highest in-order rank of the subtree rooted at i """
+        left = self.left[i]
+        low = self.rank[i] - (self.size[left] if left >= 0 else 0)
+        return (low, low + self.size[i] - 1)
+
+    def traversals(self) -> dict[str, list[int]]:
+        """ Returns the nodes in pre-order, in-order, post-order and breadth first, computed once """
+        n = self.n
+        in_order = [0] * n
+        for i in range(n):
+            in_order[self.rank[i]] = i
+        post_order = []
+        stack = [0] if n else []
+        # a reversed right first pre-order is the post-order
+        while stack:
+            i = stack.pop()
+            post_order.append(i)
+            if self.left[i] >= 0:
+                stack.append(self.left[i])
+            if self.right[i] >= 0:
+                stack.append(self.right[i])
+        post_order.reverse()
+        breadth = []
+        queue = deque([0] if n else [])
+        while queue:
+            i = queue.popleft()
+            breadth.append(i)
+            if self.left[i] >= 0:
+                queue.append(self.left[i])
+            if self.right[i] >= 0:
+                queue.append(self.right[i])
+        return {"PRE": list(range(n)), "INO": in_order, "POS": post_order, "Breadth": breadth}
+
+    def visible(self, low: float, high: float, budget: int) -> tuple[list[int], list[int]]:
+        """
+        Picks the nodes to draw for a window of in-order ranks, breadth first from the root
+        Args:
+            low (float): The lowest rank in view
+            high (float): The highest rank in view
+            budget (int): Most nodes to expand
+        Returns:
+            (list[int], list[int]): The expanded nodes, and the collapsed ones standing for their whole subtree
+        """
+        expanded, collapsed = [], []
+        queue = deque([0] if self.n else [])
+        while queue:
+            i = queue.popleft()
+            first, last = self.subtree_ranks(i)
+            if len(expanded) < budget and last >= low and first <= high:
+                expanded.append(i)
+                for child in (self.left[i], self.right[i]):
+                    if child >= 0:
+                        queue.append(child)
+            else:
+                collapsed.append(i)
+        return (expanded, collapsed)
+
+class Viewer:
+    """ Matplotlib window drawing a Skeleton with level of detail and the traversal animation """
+    def __init__(self, data: dict, budget: int = MAX_NODES):
+        """
+        Args:
+            data (dict): The snapshot, see snapshot
+            budget (int, optional): Most nodes expanded at once
+        """
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection
+        self.plt = plt
+        self.LineCollection = LineCollection
+        self.skeleton = Skeleton(data["shape"])
+        self.xs = data["xs"]
+        self.ys = data["ys"]
+        self.low = data["low"]
+        self.high = data["high"]
+        self.budget = budget
+        self.orders = self.skeleton.traversals()
+        self.shown: dict[int, bool] = {}
+        self.artists = []
+        self.step = 0
+        self.figure, self.axes = plt.subplots(figsize=(10, 6))
+        self.axes.set_yticks([])
+        self.axes.set_xlabel("in-order rank")
+        self.axes.set_xlim(-1, max(1, self.skeleton.n))
+        self.markers = {}
+        for (name, color), x in zip((("PRE", (1, 0, 0, 0.8)), ("INO", (0, 1, 0, 0.8)), ("POS", (0, 0, 1, 0.8)), ("Breadth", (1, 1, 0, 0.8))), (0.35, 0.45, 0.55, 0.65)):
+            self.axes.text(x, 0.02, name, transform=self.axes.transAxes, ha="center", fontsize=12, color=color)
+            self.markers[name], = self.axes.plot([], [], "s", markersize=14, color=color, zorder=1)
+        self.redraw()
+        self.axes.callbacks.connect("xlim_changed", lambda axes: self.redraw())
+
+    def color(self, i: int) -> str:
+        """ Returns the fill of an expanded node, highlighting the visible range the game sent """
+        rank = self.skeleton.rank[i]
+        if self.low is None:
+            return "lightgray"
+        if rank == self.low or rank == self.high:
+            return "yellow"
+        if self.low < rank < self.high:
+            return "lightgreen"
+        return "lightgray"
+
+    def redraw(self):
+        """ Lays out the nodes in view again, expanding or collapsing subtrees to fit the budget """
+        for artist in self.artists:
+            artist.remove()
+        self.artists = []
+        skeleton = self.skeleton
+        low, high = self.axes.get_xlim()
+        expanded, collapsed = skeleton.visible(low, high, self.budget)
+        self.shown = dict.fromkeys(expanded, True)
+        self.shown.update(dict.fromkeys(collapsed, False))
+        rank, depth, parent = skeleton.rank, skeleton.depth, skeleton.parent
+        edges = [((rank[parent[i]], -depth[parent[i]]), (rank[i], -depth[i])) for i in expanded + collapsed if parent[i] >= 0]
+        self.artists.append(self.axes.add_collection(self.LineCollection(edges, colors="black", linewidths=0.8, zorder=2)))
+        self.artists.append(self.axes.scatter([rank[i] for i in expanded], [-depth[i] for i in expanded],
+            s=60, marker="s", c=[self.color(i) for i in expanded], zorder=3))
+        if collapsed:
+            self.artists.append(self.axes.scatter([rank[i] for i in collapsed], [-depth[i] for i in collapsed],
+                s=60, marker="v", c="gray", zorder=3))
+        # labels only while they can be read
+        if len(expanded) + len(collapsed) <= 64:
+            for i in expanded:
+                self.artists.append(self.axes.text(rank[i], -depth[i] + 0.25, f"{self.xs[i]},{self.ys[i]}", ha="center", fontsize=7, zorder=4))
+            for i in collapsed:
+                self.artists.append(self.axes.text(rank[i], -depth[i] - 0.45, f"+{skeleton.size[i]}", ha="center", fontsize=7, zorder=4))
+        self.axes.set_ylim(-max((depth[i] for i in expanded + collapsed), default=0) - 1, 1)
+        self.axes.set_title(f"{skeleton.n} nodes, {len(expanded)} shown, {len(collapsed)} collapsed")
+        self.figure.canvas.draw_idle()
+
+    def position(self, i: int) -> tuple[int, int]:
+        """ Returns where a node is drawn, the collapsed ancestor standing for it if it is hidden """
+        skeleton = self.skeleton
+        while i not in self.shown and skeleton.parent[i] >= 0:
+            i = skeleton.parent[i]
+        return (skeleton.rank[i], -skeleton.depth[i])
+
+    def animate(self, frame = None):
+        """ Moves the traversal markers one step """
+        if self.skeleton.n == 0:
+            return
+        for name, order in self.orders.items():
+            x, y = self.position(order[self.step])
+            self.markers[name].set_data([x], [y])
+        self.step = (self.step + 1) % self.skeleton.n
+
+    def show(self):
+        """ Opens the window and runs the animation until it is closed """
+        from matplotlib.animation import FuncAnimation
+        self.animation = FuncAnimation(self.figure, self.animate, interval=STEP_INTERVAL * 1000, cache_frame_data=False)
+        self.plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="save the first frame to this image instead of opening a window")
+    parser.add_argument("--budget", type=int, default=MAX_NODES, help="most nodes expanded at once")
+    args = parser.parse_args()
+    data = pickle.load(sys.stdin.buffer)
+    if args.output:
+        import matplotlib
+        matplotlib.use("Agg")
+    viewer = Viewer(data, args.budget)
+    if args.output:
+        viewer.animate()
+        viewer.figure.savefig(args.output)
+    else:
+        viewer.show()
+
+if __name__ == "__main__":
+    main()
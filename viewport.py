@@ -0,0 +1,95 @@
+""" Module for tracking the part of a tree that falls inside the camera window """
+
+from typing import Optional, Any
+from orderedindex import OrderedIndex
+
+class Viewport:
+    """
+    Sliding window over an ordered index, kept as a pair of cursors.
+    The window covers the values in [low, high), where low is the first node inside the bounds
+    and high is the first node past them (None meaning the end of the tree).
+    Moving the window walks the cursors with their next/prev, so a frame costs as much as the
+    obstacles entering or leaving the screen instead of a pair of searches plus a full rebuild.
+    """
+    # Past this many steps a jump is cheaper to resolve with a fresh search
+    max_steps: int = 64
+
+    def __init__(self, tree: OrderedIndex):
+        """
+        Args:
+            tree (OrderedIndex): The tree, or any other index backend, to look at
+        """
+        self.tree = tree
+        self.low: Optional[Any] = None
+        self.high: Optional[Any] = None
+        self.bounds = None
+        self.version = -1
+
+    def __prev(self, node: Optional[Any]) -> Optional[Any]:
+        return self.tree.last() if node is None else node.prev()
+
+    def __walk(self, lo, hi) -> bool:
+        """ Walks the cursors to the new bounds, returns False if it took too many steps """
+        steps = 0
+        low = self.low
+        while low is not None and low.value < lo:
+            low = low.next()
+            steps += 1
+            if steps > self.max_steps:
+                return False
+        prev = self.__prev(low)
+        while prev is not None and not prev.value < lo:
+            low = prev
+            prev = low.prev()
+            steps += 1
+            if steps > self.max_steps:
+                return False
+        high = self.high
+        while high is not None and not hi < high.value:
+            high = high.next()
+            steps += 1
+            if steps > self.max_steps:
+                return False
+        prev = self.__prev(high)
+        while prev is not None and hi < prev.value:
+            high = prev
+            prev = high.prev()
+            steps += 1
+            if steps > self.max_steps:
+                return False
+        self.low = low
+        self.high = high
+        return True
+
+    def move(self, lo, hi):
+        """
+        Moves the window to the inclusive bounds [lo, hi].
+        Cursors are repaired with a search if the tree changed since the last move.
+        Args:
+            lo (Any): The lower bound
+            hi (Any): The upper bound
+        """
+        if self.version == self.tree.version and self.bounds is not None:
+            if self.bounds == (lo, hi) or self.__walk(lo, hi):
+                self.bounds = (lo, hi)
+                return
+        self.low = self.tree.lower_bound(lo)
+        self.high = self.tree.lower_bound(hi, inclusive=False)
+        self.bounds = (lo, hi)
+        self.version = self.tree.version
+
+    def nodes(self):
+        """
+        Yields the nodes inside the window, in order
+        Yields:
+            Node: The nodes in the window
+        """
+        node = self.low
+        high = self.high
+        while node is not None and node != high:
+            yield node
+            node = node.next()
+
+    def __iter__(self):
+        for node in self.nodes():
+            yield node.value